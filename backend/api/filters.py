@@ -1,7 +1,13 @@
 """Фильтрация для API."""
 
 import django_filters
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, TrigramSimilarity
+)
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
 
+from foodgram.constants import RECIPE_SEARCH_CONFIG
 from recipes.models import Ingredient, Recipe
 from users.models import CreateUser
 
@@ -38,6 +44,10 @@ class RecipeFilter(django_filters.FilterSet):
         method='filter_is_in_shopping_cart',
         label='В корзине покупок'
     )
+    search = django_filters.CharFilter(
+        method='filter_search',
+        label='Поиск'
+    )
 
     def filter_is_favorited(self, queryset, name, value):
         """Функция для определения пользовательского поля."""
@@ -53,6 +63,39 @@ class RecipeFilter(django_filters.FilterSet):
             return queryset.filter(user_cart__user=self.request.user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        """Функция для поиска рецептов по названию и тексту.
+
+        В PostgreSQL используется полнотекстовый поиск по поддерживаемому
+        триггером столбцу search_vector с нечетким поиском по названию
+        через pg_trgm, результаты упорядочены по релевантности.
+        В остальных БД выполняется поиск по подстроке.
+        """
+        value = value.strip()
+        if not value:
+            return queryset
+        if connection.vendor != 'postgresql':
+            return queryset.filter(
+                Q(name__icontains=value) | Q(text__icontains=value)
+            ).annotate(
+                name_match=Case(
+                    When(name__icontains=value, then=Value(1)),
+                    default=Value(0),
+                    output_field=IntegerField()
+                )
+            ).order_by('-name_match', '-created_at')
+        query = SearchQuery(
+            value,
+            config=RECIPE_SEARCH_CONFIG,
+            search_type='websearch'
+        )
+        return queryset.filter(
+            Q(search_vector=query) | Q(name__trigram_similar=value)
+        ).annotate(
+            rank=SearchRank(F('search_vector'), query),
+            similarity=TrigramSimilarity('name', value)
+        ).order_by('-rank', '-similarity', '-created_at')
+
     class Meta:
         """Класс определяет метаданные для фильтрации RecipeFilter."""
 
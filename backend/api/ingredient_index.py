@@ -0,0 +1,79 @@
+"""Индекс ингредиентов в памяти процесса для поиска по названию."""
+
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from recipes.models import DataVersion, Ingredient
+
+
+class IngredientIndex:
+    """Отсортированный массив названий ингредиентов.
+
+    Каждый процесс держит свою копию каталога и перечитывает его,
+    только когда меняется версия данных ингредиентов в БД. Версия
+    проверяется не чаще, чем раз в INGREDIENT_INDEX_CHECK_INTERVAL секунд.
+
+    Версия, названия и записи хранятся одним кортежем и заменяются
+    одним присваиванием, поэтому читатели без блокировки всегда видят
+    согласованный снимок.
+    """
+
+    def __init__(self):
+        """Функция для создания пустого индекса."""
+        self.lock = threading.Lock()
+        self.checked_at = None
+        self.snapshot = (None, [], [])
+
+    def refresh(self):
+        """Функция для перестроения индекса при изменении данных.
+
+        Возвращает снимок (версия, названия, записи).
+        """
+        now = time.monotonic()
+        if (self.checked_at is not None
+                and now - self.checked_at
+                < settings.INGREDIENT_INDEX_CHECK_INTERVAL):
+            return self.snapshot
+        with self.lock:
+            version = DataVersion.objects.current(Ingredient)
+            self.checked_at = now
+            if version == self.snapshot[0]:
+                return self.snapshot
+            items = sorted(
+                Ingredient.objects.values('id', 'name', 'measurement_unit'),
+                key=lambda item: (item['name'].casefold(), item['id'])
+            )
+            self.snapshot = (
+                version, [item['name'].casefold() for item in items], items
+            )
+            return self.snapshot
+
+    def search(self, name, limit=None, snapshot=None):
+        """Функция для поиска ингредиентов по названию.
+
+        Сначала идут точные совпадения, затем совпадения по началу
+        названия и в конце совпадения по подстроке. Снимок можно
+        передать, чтобы искать по той же версии, что и в ETag.
+        """
+        _, keys, items = snapshot or self.refresh()
+        name = name.casefold()
+        limit = limit or len(items)
+        result = []
+        index = bisect_left(keys, name)
+        while (index < len(keys) and len(result) < limit
+               and keys[index].startswith(name)):
+            result.append(items[index])
+            index += 1
+        if len(result) < limit:
+            for key, item in zip(keys, items):
+                if name in key and not key.startswith(name):
+                    result.append(item)
+                    if len(result) == limit:
+                        break
+        return result
+
+
+ingredient_index = IngredientIndex()
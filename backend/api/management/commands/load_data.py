@@ -1,39 +1,204 @@
 """Файл для загрузки ингредиентов в БД."""
 
-import os
+import csv
+import io
 import json
+import os
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from foodgram.constants import (
+    INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH,
+    INGREDIENT_NAME_MAX_LENGTH
+)
+from recipes.models import DataVersion, Ingredient
+
+
+def iter_json(file, chunk_size=1 << 16):
+    """Функция для потокового чтения объектов из JSON массива.
+
+    Файл читается частями, а объекты разбираются по одному,
+    поэтому весь массив в память не загружается.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if not buffer:
+            if eof:
+                return
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = chunk
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item
+
 
-from recipes.models import Ingredient
+def iter_csv(file):
+    """Функция для чтения строк CSV файла с заголовком или без него."""
+    reader = csv.reader(file)
+    for row in reader:
+        if row == ['name', 'measurement_unit']:
+            continue
+        yield dict(zip(('name', 'measurement_unit'), row))
 
 
 class Command(BaseCommand):
-    """Класс для создания ингредиентов в БД."""
+    """Класс для загрузки ингредиентов в БД.
+
+    Файл читается потоком, строки проверяются и загружаются пачками.
+    Уже существующие ингредиенты пропускаются, поэтому команду можно
+    запускать повторно. На PostgreSQL пачки копируются командой COPY
+    во временную таблицу, откуда добавляются одним INSERT.
+    """
+
+    help = 'Загружает ингредиенты из JSON или CSV файла'
+    readers = {'json': iter_json, 'csv': iter_csv}
+    max_reported_errors = 10
 
     def add_arguments(self, parser):
-        """Функция для добавления передачи пути к JSON файлу."""
+        """Функция для добавления аргументов команды."""
         parser.add_argument('ingredients.json', type=str)
+        parser.add_argument(
+            '--format',
+            choices=tuple(self.readers),
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def validate(self, item):
+        """Функция для проверки и нормализации строки файла."""
+        if not isinstance(item, dict):
+            return None
+        name = item.get('name')
+        measurement_unit = item.get('measurement_unit')
+        if not isinstance(name, str) or not isinstance(measurement_unit, str):
+            return None
+        name = name.strip()
+        measurement_unit = measurement_unit.strip()
+        if (
+            not name
+            or not measurement_unit
+            or len(name) > INGREDIENT_NAME_MAX_LENGTH
+            or len(measurement_unit) > INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH
+        ):
+            return None
+        return name, measurement_unit
+
+    def iter_batches(self, items, batch_size):
+        """Функция для разбиения проверенных строк на пачки."""
+        self.invalid = 0
+        valid = []
+        for number, item in enumerate(items, start=1):
+            row = self.validate(item)
+            if row is None:
+                self.invalid += 1
+                if self.invalid <= self.max_reported_errors:
+                    self.stderr.write(f'Строка {number} пропущена: {item}')
+                continue
+            valid.append(row)
+            if len(valid) >= batch_size:
+                yield valid
+                valid = []
+        if valid:
+            yield valid
+
+    def load_copy(self, batches):
+        """Функция для загрузки через COPY во временную таблицу."""
+        table = Ingredient._meta.db_table
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_staging '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            for batch in batches:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredient_staging (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer
+                )
+                total += len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_staging '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            inserted = cursor.rowcount
+        return inserted, total - inserted
+
+    def load_bulk(self, batches):
+        """Функция для загрузки через bulk_create с пропуском дублей."""
+        inserted = skipped = 0
+        for batch in batches:
+            rows = set(batch)
+            skipped += len(batch) - len(rows)
+            existing = set(Ingredient.objects.filter(
+                name__in={name for name, _ in rows}
+            ).values_list('name', 'measurement_unit'))
+            new = rows - existing
+            skipped += len(rows) - len(new)
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in new
+                ],
+                ignore_conflicts=True
+            )
+            inserted += len(new)
+        return inserted, skipped
 
     def handle(self, *args, **options):
-        """Функция для создания ингредиентов в БД."""
-        json_file = options['ingredients.json']
+        """Функция для загрузки ингредиентов в БД."""
+        file_name = options['ingredients.json']
         file_path = os.path.join(
-            settings.BASE_DIR, 'api', 'management', json_file
+            settings.BASE_DIR, 'api', 'management', file_name
         )
+        file_format = options['format'] or os.path.splitext(
+            file_name
+        )[1].lstrip('.').lower()
+        if file_format not in self.readers:
+            self.stdout.write(self.style.ERROR(
+                f'Неизвестный формат файла {file_name}'
+            ))
+            return
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-
-            for item in data:
-                Ingredient.objects.create(**item)
+            with open(file_path, 'r', encoding='utf-8', newline='') as file:
+                batches = self.iter_batches(
+                    self.readers[file_format](file),
+                    options['batch_size']
+                )
+                with transaction.atomic():
+                    if connection.vendor == 'postgresql':
+                        inserted, skipped = self.load_copy(batches)
+                    else:
+                        inserted, skipped = self.load_bulk(batches)
+                    if inserted:
+                        DataVersion.objects.bump(Ingredient)
 
             self.stdout.write(self.style.SUCCESS(
-                'Данные успешно были загружены'
-            )
-            )
+                'Данные успешно были загружены: '
+                f'добавлено {inserted}, уже были {skipped}, '
+                f'с ошибками {self.invalid}'
+            ))
 
         except FileNotFoundError:
             self.stdout.write(self.style.ERROR(f'Файл {file_path} не найден'))
@@ -0,0 +1,117 @@
+"""Файл для пересчета списков покупок пользователей."""
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from recipes.models import (
+    IngredientRecipe, ShoppingCart, ShoppingCartIngredient
+)
+
+
+class Command(BaseCommand):
+    """Класс для пересчета или проверки списков покупок в БД."""
+
+    help = 'Пересчитывает списки покупок по содержимому корзин'
+    batch_size = 1000
+
+    def add_arguments(self, parser):
+        """Функция для добавления режима проверки."""
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить списки покупок с корзинами'
+        )
+
+    @staticmethod
+    def get_expected(user_ids=None):
+        """Функция для подсчета списков покупок по корзинам."""
+        return {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total
+            in ShoppingCartIngredient.objects.calculate(user_ids).iterator()
+        }
+
+    @staticmethod
+    def lock_sources():
+        """Функция для блокировки изменений корзин и рецептов.
+
+        Режим SHARE не мешает чтению, а записи в корзины и ингредиенты
+        рецептов ждут конца транзакции и затем применяют свою разницу
+        к уже пересчитанным спискам.
+        """
+        if connection.vendor != 'postgresql':
+            return
+        tables = ', '.join(
+            connection.ops.quote_name(model._meta.db_table)
+            for model in (ShoppingCart, IngredientRecipe)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {tables} IN SHARE MODE')
+
+    def rebuild(self, user_ids):
+        """Функция для пересчета списков покупок пользователей."""
+        with transaction.atomic():
+            self.lock_sources()
+            ShoppingCartIngredient.objects.filter(
+                user_id__in=user_ids
+            ).delete()
+            expected = self.get_expected(user_ids)
+            ShoppingCartIngredient.objects.bulk_create(
+                [
+                    ShoppingCartIngredient(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=total
+                    )
+                    for (user_id, ingredient_id), total in expected.items()
+                ],
+                batch_size=self.batch_size
+            )
+        return len(expected)
+
+    def handle(self, *args, **options):
+        """Функция для пересчета списков покупок.
+
+        Списки пересчитываются пачками пользователей, каждая в своей
+        транзакции. На время пачки изменения корзин и ингредиентов
+        рецептов ждут ее завершения, поэтому команду можно запускать
+        на работающем сайте: записи не теряются и не конфликтуют
+        с пересчетом, но ненадолго задерживаются.
+        """
+        if options['verify']:
+            expected = self.get_expected()
+            actual = {
+                (user_id, ingredient_id): amount
+                for user_id, ingredient_id, amount
+                in ShoppingCartIngredient.objects.values_list(
+                    'user_id', 'ingredient_id', 'amount'
+                ).iterator()
+            }
+            mismatched = {
+                key for key in expected.keys() | actual.keys()
+                if expected.get(key) != actual.get(key)
+            }
+            if mismatched:
+                users = {user_id for user_id, _ in mismatched}
+                self.stdout.write(self.style.ERROR(
+                    f'Расхождений: {len(mismatched)}, '
+                    f'пользователей: {len(users)}'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    'Списки покупок совпадают с корзинами'
+                ))
+            return
+        user_ids = sorted({
+            user_id
+            for model in (ShoppingCart, ShoppingCartIngredient)
+            for user_id in model.objects.values_list(
+                'user_id', flat=True
+            ).order_by().distinct()
+        })
+        total = 0
+        for start in range(0, len(user_ids), self.batch_size):
+            total += self.rebuild(user_ids[start:start + self.batch_size])
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересчитаны, записей: {total}'
+        ))
@@ -0,0 +1,40 @@
+"""Файл для перезаписи коротких ссылок рецептов."""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import short_url
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Класс для перезаписи коротких ссылок по id рецептов."""
+
+    help = 'Перезаписывает короткие ссылки рецептов по их id'
+    batch_size = 1000
+
+    def handle(self, *args, **options):
+        """Функция для перезаписи коротких ссылок пачками."""
+        updated = 0
+        last_id = 0
+        while True:
+            recipes = list(
+                Recipe.objects.filter(id__gt=last_id).order_by('id').only(
+                    'id', 'short_url'
+                )[:self.batch_size]
+            )
+            if not recipes:
+                break
+            last_id = recipes[-1].id
+            changed = []
+            for recipe in recipes:
+                code = short_url.encode(recipe.id)
+                if recipe.short_url != code:
+                    recipe.short_url = code
+                    changed.append(recipe)
+            with transaction.atomic():
+                Recipe.objects.bulk_update(changed, ['short_url'])
+            updated += len(changed)
+        self.stdout.write(self.style.SUCCESS(
+            f'Короткие ссылки перезаписаны: {updated}'
+        ))
@@ -0,0 +1,94 @@
+"""Файл для сверки счетчиков рецептов и пользователей."""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, (
+        ('favorites_count', Favorite, 'recipe_id'),
+        ('in_carts_count', ShoppingCart, 'recipe_id'),
+    )),
+    (User, (
+        ('recipes_count', Recipe, 'author_id'),
+        ('followers_count', Follow, 'following_id'),
+    )),
+)
+
+
+class Command(BaseCommand):
+    """Класс для пересчета или проверки счетчиков в БД.
+
+    Записи обходятся пачками по возрастанию id. Пачка блокируется
+    на время пересчета, поэтому изменения счетчиков из одновременных
+    запросов не затираются, а обновляются только расходящиеся записи.
+    """
+
+    help = 'Пересчитывает счетчики избранного, корзин, рецептов и подписок'
+
+    def add_arguments(self, parser):
+        """Функция для добавления аргументов команды."""
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить счетчики с данными'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def reconcile_batch(self, model, counters, last_id, batch_size, verify):
+        """Функция для пересчета счетчиков одной пачки записей."""
+        fields = [field for field, _, _ in counters]
+        objects = list(
+            model.objects.filter(pk__gt=last_id).order_by('pk').only(
+                'pk', *fields
+            ).select_for_update()[:batch_size]
+        )
+        ids = [obj.pk for obj in objects]
+        changed = {}
+        for field, related_model, column in counters:
+            actual = dict(related_model.objects.filter(
+                **{f'{column}__in': ids}
+            ).values(column).annotate(
+                total=Count('pk')
+            ).values_list(column, 'total').order_by())
+            for obj in objects:
+                value = actual.get(obj.pk, 0)
+                if getattr(obj, field) != value:
+                    setattr(obj, field, value)
+                    changed[obj.pk] = obj
+        if changed and not verify:
+            model.objects.bulk_update(changed.values(), fields)
+        return ids[-1] if ids else None, len(changed)
+
+    def handle(self, *args, **options):
+        """Функция для пересчета счетчиков."""
+        for model, counters in COUNTERS:
+            last_id = 0
+            total = 0
+            while last_id is not None:
+                with transaction.atomic():
+                    last_id, changed = self.reconcile_batch(
+                        model, counters, last_id,
+                        options['batch_size'], options['verify']
+                    )
+                total += changed
+            name = model._meta.verbose_name_plural
+            if not total:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{name}: счетчики совпадают с данными'
+                ))
+            elif options['verify']:
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: расхождений {total}'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{name}: исправлено записей {total}'
+                ))
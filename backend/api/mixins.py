@@ -0,0 +1,262 @@
+"""Примеси для представлений API."""
+
+import gzip
+import hashlib
+
+import brotli
+from django.core.cache import cache
+from django.db.models import Count, Max, Value
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+    quote_etag
+)
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from foodgram.constants import (
+    PROXY_CACHE_LIST_MAX_AGE,
+    PROXY_CACHE_MAX_AGE,
+    SNAPSHOT_MAX_AGE
+)
+from foodgram.metrics import current_metrics
+from foodgram.prometheus import record_cache
+from recipes.models import DataVersion, Favorite, ShoppingCart
+from users.models import Follow
+
+
+ENCODINGS = ('br', 'gzip')
+
+
+def get_encoding(accept_encoding):
+    """Функция для выбора сжатия по заголовку Accept-Encoding.
+
+    Учитываются веса q: сжатие с q=0 клиент явно не принимает.
+    При равных весах предпочитается порядок ENCODINGS.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        name, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for name in ENCODINGS:
+        quality = qualities.get(name, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def get_viewer_stamp(user):
+    """Функция для получения отпечатка избранного, корзины и подписок.
+
+    Для каждой таблицы берется пара (количество, максимальный id):
+    добавление записи увеличивает максимум, удаление без добавления
+    уменьшает количество, поэтому любое изменение меняет отпечаток.
+    """
+    if not user.is_authenticated:
+        return None
+    querysets = [
+        model.objects.filter(user=user).values('user').annotate(
+            kind=Value(model._meta.model_name),
+            count=Count('id'),
+            last=Max('id')
+        ).values_list('kind', 'count', 'last').order_by()
+        for model in (Favorite, ShoppingCart, Follow)
+    ]
+    return sorted(querysets[0].union(*querysets[1:], all=True))
+
+
+class RequestMetricsMixin:
+    """Примесь для замера времени обработчика представления.
+
+    Замер начинается после аутентификации и проверки прав и
+    заканчивается перед финальной обработкой ответа, время запросов
+    к БД из него вычитается RequestMetricsMiddleware.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        """Функция для начала замера после проверок запроса."""
+        super().initial(request, *args, **kwargs)
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.start_handler()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Функция для окончания замера обработчика."""
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.stop_handler()
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ConditionalResponseMixin:
+    """Примесь для условных ответов 304 на list и retrieve.
+
+    Представление задает get_etag и, при необходимости,
+    get_last_modified, которые вычисляются небольшими запросами
+    до сериализации. Если ответ зависит от пользователя,
+    personalized должен быть истинным.
+    """
+
+    personalized = False
+
+    def get_etag(self, request):
+        """Функция для получения данных, из которых строится ETag."""
+        return None
+
+    def get_last_modified(self, request):
+        """Функция для получения времени последнего изменения."""
+        return None
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        """Функция для ответа 304 или вызова обработчика."""
+        etag = self.get_etag(request)
+        if etag is not None:
+            etag = quote_etag(
+                hashlib.md5(repr(etag).encode()).hexdigest()
+            )
+        last_modified = self.get_last_modified(request)
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag is not None:
+                response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            if self.personalized:
+                patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """Функция для получения списка с проверкой валидаторов."""
+        return self.conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Функция для получения объекта с проверкой валидаторов."""
+        return self.conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+
+class ProxyCacheMixin:
+    """Примесь для кэширования анонимных ответов на прокси.
+
+    Ответы list и retrieve без авторизации одинаковы для всех, поэтому
+    помечаются общими для кэша прокси и получают заголовок Surrogate-Key
+    с ключами из get_surrogate_keys. Список хранится меньше, чем объект:
+    объект сбрасывается после записи, а список проверяется по ETag.
+    """
+
+    proxy_cache_max_age = PROXY_CACHE_MAX_AGE
+    proxy_cache_list_max_age = PROXY_CACHE_LIST_MAX_AGE
+
+    def get_surrogate_keys(self, data):
+        """Функция для получения суррогатных ключей ответа."""
+        return []
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Функция для добавления заголовков кэша прокси."""
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if (
+            request.method in ('GET', 'HEAD')
+            and self.action in ('list', 'retrieve')
+            and not request.user.is_authenticated
+            and response.status_code in (200, 304)
+        ):
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=0,
+                s_maxage=(
+                    self.proxy_cache_list_max_age
+                    if self.action == 'list' else self.proxy_cache_max_age
+                )
+            )
+            if response.status_code == 200:
+                response['Surrogate-Key'] = ' '.join(
+                    self.get_surrogate_keys(response.data)
+                )
+        return response
+
+
+class SnapshotMixin(ConditionalResponseMixin):
+    """Примесь для отдачи справочника из готового снимка.
+
+    Список без параметров один раз сериализуется в JSON, сжимается
+    gzip и brotli и кладется в кэш с ключом по версии данных модели.
+    Пока версия не изменилась, ответ собирается из готовых байтов.
+    """
+
+    snapshot_max_age = SNAPSHOT_MAX_AGE
+
+    def get_etag(self, request):
+        """Функция для получения данных для ETag по версии модели.
+
+        Снимок отдается разными байтами для каждого сжатия, поэтому
+        и ETag у каждого сжатия свой.
+        """
+        model = self.get_queryset().model
+        self.data_version = DataVersion.objects.current(model)
+        if request.query_params:
+            return (model._meta.label_lower, self.data_version)
+        self.encoding = get_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        return (model._meta.label_lower, self.data_version, self.encoding)
+
+    def get_snapshot(self):
+        """Функция для получения снимка из кэша или его создания."""
+        model = self.get_queryset().model
+        key = f'snapshot:{model._meta.label_lower}:{self.data_version}'
+        snapshot = cache.get(key)
+        if snapshot is None:
+            record_cache('snapshot', misses=1)
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            body = JSONRenderer().render(serializer.data)
+            snapshot = {
+                None: body,
+                'gzip': gzip.compress(body),
+                'br': brotli.compress(body)
+            }
+            cache.set(key, snapshot, None)
+        else:
+            record_cache('snapshot', hits=1)
+        return snapshot
+
+    def snapshot_response(self, request):
+        """Функция для ответа байтами снимка в подходящем сжатии."""
+        snapshot = self.get_snapshot()
+        encoding = self.encoding
+        response = HttpResponse(
+            snapshot[encoding], content_type='application/json'
+        )
+        if encoding is not None:
+            response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        patch_cache_control(
+            response, public=True, max_age=self.snapshot_max_age
+        )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """Функция для получения списка из снимка, если нет фильтров."""
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(request, self.snapshot_response)
@@ -1,12 +1,327 @@
 """Пагинация для API."""
 
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import partial
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from foodgram import constants
+from foodgram.prometheus import record_cache
+from recipes.models import DataVersion
+
+
+def get_estimated_count(model, threshold=constants.ESTIMATED_COUNT_THRESHOLD):
+    """Функция для получения оценки количества строк таблицы.
+
+    Оценка берется из статистики планировщика PostgreSQL и
+    возвращается только для таблиц больше threshold строк.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < threshold:
+        return None
+    return int(row[0])
+
+
+class KeysetPagination(BasePagination):
+    """Пагинатор KeysetPagination.
+
+    Страницы выбираются по значениям ключа последней записи, а не
+    по смещению, поэтому глубокие страницы не медленнее первых,
+    а количество записей не считается. Ключ берется из атрибута
+    представления cursor_ordering и должен быть уникальным.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = constants.PAGE_SIZE
+    max_page_size = constants.MAX_PAGE_SIZE
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Неверный курсор'
+
+    def get_page_size(self, request):
+        """Функция для получения размера страницы из запроса."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Функция для чтения позиции и направления из курсора."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            reverse, *position = json.loads(
+                base64.urlsafe_b64decode(encoded.encode()).decode()
+            )
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(reverse)
+
+    def clean_position(self, model, position):
+        """Функция для приведения значений курсора к типам полей.
+
+        Курсор приходит от клиента, поэтому значения, которые
+        нельзя привести к типу поля ключа, считаются неверным курсором.
+        """
+        cleaned = []
+        for field, value in zip(self.ordering, position):
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                cleaned.append(
+                    model._meta.get_field(field.lstrip('-')).to_python(value)
+                )
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def encode_cursor(self, item, reverse):
+        """Функция для создания курсора по ключу записи."""
+        position = []
+        for field in self.ordering:
+            value = getattr(item, field.lstrip('-'))
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            position.append(value)
+        encoded = base64.urlsafe_b64encode(
+            json.dumps([reverse, *position]).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_keyset_filter(self, position, reverse):
+        """Функция для построения условия «после ключа»."""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(self.ordering[:index], position):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Функция для выбора страницы после позиции курсора."""
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            position = self.clean_position(queryset.model, position)
+            queryset = queryset.filter(
+                self.get_keyset_filter(position, reverse)
+            )
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+        has_next = has_more if not reverse else True
+        has_previous = has_more if reverse else position is not None
+        self.next = (
+            self.encode_cursor(results[-1], False)
+            if has_next and results else None
+        )
+        self.previous = (
+            self.encode_cursor(results[0], True)
+            if has_previous and results else None
+        )
+        return results
+
+    def get_paginated_response(self, data):
+        """Функция для формирования ответа без количества записей."""
+        return Response(OrderedDict([
+            ('next', self.next),
+            ('previous', self.previous),
+            ('results', data)
+        ]))
+
+
+class CountedPaginator(Paginator):
+    """Пагинатор, получающий количество записей от поставщика."""
+
+    def __init__(self, *args, count_provider=None, **kwargs):
+        """Функция для создания пагинатора с поставщиком количества."""
+        super().__init__(*args, **kwargs)
+        self.count_provider = count_provider
+        self.count_exact = True
+
+    @cached_property
+    def count(self):
+        """Функция для получения количества записей."""
+        if self.count_provider is None:
+            return super().count
+        count, self.count_exact = self.count_provider(self.object_list)
+        return count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для админки с оценкой количества записей.
+
+    Для списка без фильтров и поиска количество больших таблиц
+    берется из статистики PostgreSQL вместо COUNT по всей таблице.
+    """
+
+    @cached_property
+    def count(self):
+        """Функция для получения количества записей."""
+        queryset = self.object_list
+        if not queryset.query.has_filters():
+            estimate = get_estimated_count(queryset.model)
+            if estimate is not None:
+                return estimate
+        return super().count
+
+
+class CachedCountProvider:
+    """Поставщик количества записей CachedCountProvider.
+
+    Для списков без фильтров или только с фильтрами из cache_params
+    количество берется из кэша по сигнатуре фильтров и версии данных
+    модели, которая увеличивается при каждой записи. Для очень больших
+    таблиц без фильтров используется оценка планировщика PostgreSQL.
+    """
+
+    ignored_params = ('page', 'limit', 'format')
+    estimate_threshold = constants.ESTIMATED_COUNT_THRESHOLD
+    timeout = constants.COUNT_CACHE_TIMEOUT
+
+    def __init__(self, request, cache_params):
+        """Функция для создания поставщика для запроса."""
+        self.request = request
+        self.cache_params = cache_params
+
+    def get_signature(self):
+        """Функция для получения сигнатуры фильтров запроса."""
+        params = self.request.query_params
+        signature = []
+        for param in sorted(params):
+            if param in self.ignored_params:
+                continue
+            if param not in self.cache_params:
+                return None
+            values = ','.join(sorted(params.getlist(param)))
+            signature.append(f'{param}={values}')
+        return '&'.join(signature)
+
+    def __call__(self, queryset):
+        """Функция для получения количества и признака точности."""
+        signature = self.get_signature()
+        if signature is None:
+            return queryset.count(), True
+        model = queryset.model
+        if not signature:
+            estimate = get_estimated_count(model, self.estimate_threshold)
+            if estimate is not None:
+                return estimate, False
+        key = 'count:{}:{}:{}'.format(
+            model._meta.label_lower,
+            DataVersion.objects.current(model),
+            signature
+        )
+        count = cache.get(key)
+        if count is None:
+            record_cache('count', misses=1)
+            count = queryset.count()
+            cache.set(key, count, self.timeout)
+        else:
+            record_cache('count', hits=1)
+        return count, True
 
 
 class CustomPagination(PageNumberPagination):
-    """Пагинатор CustomPagination."""
+    """Пагинатор CustomPagination.
+
+    По умолчанию работает постранично по номеру страницы. Если
+    в запросе передан параметр cursor (в том числе пустой),
+    используется KeysetPagination. Курсор не учитывается, если
+    фильтры уже упорядочили список иначе, чем ключ курсора,
+    например по релевантности поиска.
+
+    Если у представления задан атрибут count_cache_params, количество
+    записей получается через CachedCountProvider, а в ответе
+    поле count_exact показывает, точное ли оно.
+    """
 
     page_size = constants.PAGE_SIZE
     page_size_query_param = 'limit'
+    max_page_size = constants.MAX_PAGE_SIZE
+    keyset_class = KeysetPagination
+    keyset = None
+
+    def use_keyset(self, queryset, request, view):
+        """Функция для проверки, можно ли листать список курсором.
+
+        Порядок, заданный в наборе запросов, должен быть началом
+        ключа курсора, иначе keyset-пагинация его бы заменила.
+        """
+        if self.keyset_class.cursor_query_param not in request.query_params:
+            return False
+        ordering = tuple(queryset.query.order_by)
+        cursor_ordering = tuple(
+            getattr(view, 'cursor_ordering', self.keyset_class.ordering)
+        )
+        return ordering == cursor_ordering[:len(ordering)]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Функция для выбора способа пагинации."""
+        if self.use_keyset(queryset, request, view):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        cache_params = getattr(view, 'count_cache_params', None)
+        if cache_params is not None:
+            self.django_paginator_class = partial(
+                CountedPaginator,
+                count_provider=CachedCountProvider(request, cache_params)
+            )
+        else:
+            self.django_paginator_class = CountedPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        """Функция для формирования ответа выбранного пагинатора."""
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_exact', self.page.paginator.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
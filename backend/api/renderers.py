@@ -0,0 +1,136 @@
+"""Форматы списка покупок для API."""
+
+import csv
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont, TTFError
+from reportlab.pdfgen import canvas
+from rest_framework import renderers
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class ShoppingCartContentNegotiation(DefaultContentNegotiation):
+    """Выбор формата списка покупок только по параметру format."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        """Функция для выбора формата без учета заголовка Accept."""
+        format_query_param = self.settings.URL_FORMAT_OVERRIDE
+        format = format_suffix or request.query_params.get(format_query_param)
+        if format:
+            renderers = self.filter_renderers(renderers, format)
+        return renderers[0], renderers[0].media_type
+
+
+class ShoppingCartTextRenderer(renderers.BaseRenderer):
+    """Список покупок в виде текстового файла."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+    filename = 'shopping_cart.txt'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Функция для формирования ответа с ошибкой.
+
+        Сам файл отдается потоком из представления, сюда попадают
+        только ответы с ошибками, поэтому они возвращаются в JSON.
+        """
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return renderers.JSONRenderer().render(data)
+
+    def stream(self, ingredients):
+        """Функция для построчного формирования файла."""
+        for name, measurement_unit, amount in ingredients:
+            yield f'{name} ({measurement_unit}) - {amount}\n'.encode()
+
+
+class Echo:
+    """Буфер, который сразу возвращает записанную строку."""
+
+    def write(self, value):
+        """Функция для записи строки."""
+        return value
+
+
+class ShoppingCartCSVRenderer(ShoppingCartTextRenderer):
+    """Список покупок в виде CSV файла."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+    filename = 'shopping_cart.csv'
+    header = ('Ингредиент', 'Единица измерения', 'Количество')
+
+    def stream(self, ingredients):
+        """Функция для построчного формирования файла."""
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.header).encode()
+        for row in ingredients:
+            yield writer.writerow(row).encode()
+
+
+class ShoppingCartPDFRenderer(ShoppingCartTextRenderer):
+    """Список покупок в виде PDF файла с разбивкой на страницы.
+
+    PDF нельзя отдавать по частям до того, как известны смещения
+    объектов, поэтому документ собирается в памяти. Его размер
+    ограничен числом разных ингредиентов, а не числом рецептов.
+    """
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    filename = 'shopping_cart.pdf'
+    title = 'Список покупок'
+    font_name = 'ShoppingCartFont'
+    font_size = 12
+    line_height = 18
+    margin = 2 * cm
+
+    def get_font_name(self):
+        """Функция для регистрации шрифта с поддержкой кириллицы."""
+        if self.font_name in pdfmetrics.getRegisteredFontNames():
+            return self.font_name
+        try:
+            pdfmetrics.registerFont(
+                TTFont(self.font_name, settings.SHOPPING_CART_PDF_FONT)
+            )
+        except (OSError, TTFError):
+            return 'Helvetica'
+        return self.font_name
+
+    def stream(self, ingredients):
+        """Функция для формирования файла по страницам."""
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        pdf.setTitle(self.title)
+        font_name = self.get_font_name()
+        width, height = A4
+        page_number = 1
+        y = None
+        for name, measurement_unit, amount in ingredients:
+            if y is None or y < self.margin:
+                if y is not None:
+                    pdf.showPage()
+                    page_number += 1
+                pdf.setFont(font_name, self.font_size)
+                pdf.drawString(self.margin, height - self.margin, self.title)
+                pdf.drawRightString(
+                    width - self.margin, self.margin / 2, str(page_number)
+                )
+                y = height - self.margin - 2 * self.line_height
+            pdf.drawString(
+                self.margin, y, f'{name} ({measurement_unit}) - {amount}'
+            )
+            y -= self.line_height
+        if y is None:
+            pdf.setFont(font_name, self.font_size)
+            pdf.drawString(self.margin, height - self.margin, self.title)
+        pdf.showPage()
+        pdf.save()
+        yield buffer.getvalue()
@@ -1,14 +1,26 @@
 """Сериализация данных для API."""
 
 import base64
+from collections import Counter
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Value
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
+from foodgram.constants import (
+    BULK_MAX_IDS,
+    IMAGE_MAX_UPLOAD_SIZE,
+    RECIPE_FRAGMENT_CACHE_TIMEOUT
+)
+from foodgram.prometheus import record_cache
+from recipes import images
 from recipes.models import (
-    Favorite, Ingredient, IngredientRecipe,
-    Recipe, ShoppingCart, Tag
+    DataVersion, Favorite, Ingredient, IngredientRecipe,
+    Recipe, ShoppingCart, ShoppingCartIngredient, Tag
 )
 from users.models import Follow
 
@@ -20,19 +32,54 @@ class Base64ImageField(serializers.ImageField):
     """Сериализатор Base64ImageField."""
 
     def to_internal_value(self, data):
-        """Функция для форматирования данных изображения."""
+        """Функция для форматирования и проверки данных изображения.
+
+        Размер файла проверяется до декодирования, а ширина и высота
+        читаются из заголовка до полной распаковки изображения.
+        """
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
+            if len(imgstr) * 3 // 4 > IMAGE_MAX_UPLOAD_SIZE:
+                raise serializers.ValidationError(
+                    'Размер изображения слишком большой'
+                )
             ext = format.split('/')[-1]
             data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
 
-        return super().to_internal_value(data)
+        image = super().to_internal_value(data)
+        if not images.check_dimensions(image):
+            raise serializers.ValidationError(
+                'Ширина или высота изображения слишком большие'
+            )
+        return image
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Сериализатор адресов уменьшенных копий изображения."""
+
+    def __init__(self, renditions, **kwargs):
+        """Функция для создания поля с набором копий."""
+        self.renditions = renditions
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        """Функция для получения адресов созданных копий."""
+        urls = images.get_rendition_urls(value, self.renditions)
+        request = self.context.get('request')
+        if request is not None:
+            for formats in urls.values():
+                for format, url in formats.items():
+                    formats[format] = request.build_absolute_uri(url)
+        return urls
 
 
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор UserSerializer."""
 
     avatar = Base64ImageField(required=False, allow_null=True)
+    avatar_renditions = ImageRenditionsField(
+        images.AVATAR_RENDITIONS, source='avatar'
+    )
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -40,11 +87,14 @@ class UserSerializer(serializers.ModelSerializer):
 
         model = User
         fields = ('id', 'username', 'first_name',
-                  'last_name', 'email', 'is_subscribed', 'avatar'
+                  'last_name', 'email', 'is_subscribed', 'avatar',
+                  'avatar_renditions'
                   )
 
     def get_is_subscribed(self, obj):
         """Функция для получения данных о подписке на пользователя."""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context['request']
         return (request
                 and request.user.is_authenticated
@@ -57,19 +107,22 @@ class RecipeMinifiedSerializer(serializers.ModelSerializer):
     """Сериализатор RecipeMinifiedSerializer."""
 
     image = Base64ImageField(required=False, allow_null=True)
+    image_renditions = ImageRenditionsField(
+        images.RECIPE_RENDITIONS, source='image'
+    )
 
     class Meta:
         """Класс определяет метаданные для сериализатора."""
 
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
 
 
 class UserWithRecipesSerializer(UserSerializer):
     """Сериализатор UserWithRecipesSerializer."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         """Класс определяет метаданные для сериализатора."""
@@ -80,32 +133,50 @@ class UserWithRecipesSerializer(UserSerializer):
             'recipes_count'
         )
 
+    @staticmethod
+    def annotate_authors(queryset):
+        """Функция для добавления флага подписки.
+
+        Используется только для авторов, на которых подписан пользователь,
+        поэтому флаг подписки всегда истинный.
+        """
+        return queryset.annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        )
+
+    @staticmethod
+    def attach_recipes(authors, request):
+        """Функция для подгрузки рецептов всех авторов одним запросом."""
+        recipes_limit = request.query_params.get('recipes_limit')
+        try:
+            recipes_limit = int(recipes_limit)
+        except (TypeError, ValueError):
+            recipes_limit = None
+        if recipes_limit is not None and recipes_limit < 0:
+            recipes_limit = None
+        author_recipes = {author.id: [] for author in authors}
+        for recipe in Recipe.objects.first_per_author(authors, recipes_limit):
+            author_recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.recipes_preview = author_recipes[author.id]
+        return authors
+
     def get_recipes(self, obj):
         """Функция для получения рецептов для пользователя."""
-        request = self.context['request']
-        recipes_limit = request.query_params.get('recipes_limit')
-        recipes = Recipe.objects.all().filter(author=obj)
-        if recipes_limit:
-            try:
-                recipes = recipes[:int(recipes_limit)]
-            except ValueError:
-                pass
+        if hasattr(obj, 'recipes_preview'):
+            recipes = obj.recipes_preview
+        else:
+            request = self.context['request']
+            recipes_limit = request.query_params.get('recipes_limit')
+            recipes = Recipe.objects.all().filter(author=obj)
+            if recipes_limit:
+                try:
+                    recipes = recipes[:int(recipes_limit)]
+                except ValueError:
+                    pass
         serializer = RecipeMinifiedSerializer(recipes, many=True)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        """Функция для получения количества рецептов."""
-        return obj.recipes.count()
-
-    def get_is_subscribed(self, obj):
-        """Функция для получения данных о подписке на пользователя."""
-        request = self.context['request']
-        return (request
-                and request.user.is_authenticated
-                and Follow.objects.filter(
-                    user=request.user, following=obj
-                ).exists())
-
 
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор TagSerializer."""
@@ -130,7 +201,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 class IngredientInRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор IngredientInRecipeSerializer."""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
 
     class Meta:
         """Класс определяет метаданные для сериализатора."""
@@ -170,10 +241,7 @@ class AvatarSerializer(serializers.ModelSerializer):
 class RecipeSerializer(serializers.ModelSerializer):
     """Сериализатор RecipeSerializer."""
 
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all()
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = IngredientInRecipeSerializer(
         many=True,
         source='ingredient_recipe'
@@ -190,17 +258,18 @@ class RecipeSerializer(serializers.ModelSerializer):
             'name', 'image', 'text', 'cooking_time'
         )
 
-    def to_internal_value(self, data):
-        """Функция для преобразования данных."""
-        internal_value = super().to_internal_value(data)
-        internal_value['ingredient_recipe'] = data.get('ingredients')
-        return internal_value
-
     def to_representation(self, instance):
-        """Функция для преобразования данных."""
+        """Функция для преобразования данных.
+
+        Рецепт перечитывается одним запросом с флагами пользователя
+        и подгруженными связями, чтобы ответ не делал запросов
+        на каждый ингредиент.
+        """
         request = self.context['request']
         serializer = RecipeGetSerializer(
-            instance,
+            Recipe.objects.with_user_flags(request.user).with_related().get(
+                pk=instance.pk
+            ),
             context={'request': request}
         )
         return serializer.data
@@ -211,7 +280,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredient_objects = []
         for obj in ingredients:
             ingredient_recipe = IngredientRecipe(
-                ingredient_id=obj['id'],
+                ingredient=obj['ingredient'],
                 recipe=instance,
                 amount=obj['amount']
             )
@@ -228,13 +297,71 @@ class RecipeSerializer(serializers.ModelSerializer):
         instance.tags.add(*tags)
         return instance
 
+    @staticmethod
+    def update_ingredients(instance, ingredients):
+        """Функция для изменения только отличающихся ингредиентов.
+
+        Возвращает изменения количеств по ингредиентам для списков
+        покупок пользователей, добавивших рецепт в корзину, включая
+        удаленные ингредиенты. Строки удаляются без сигналов, чтобы
+        списки не менялись отдельно для каждой удаленной строки.
+        """
+        rows = {}
+        removed = []
+        for row in instance.ingredient_recipe.all():
+            if row.ingredient_id in rows:
+                removed.append(row)
+            else:
+                rows[row.ingredient_id] = row
+        amounts = {obj['id']: obj['amount'] for obj in ingredients}
+        removed.extend(
+            row for ingredient_id, row in rows.items()
+            if ingredient_id not in amounts
+        )
+        deltas = Counter()
+        for row in removed:
+            deltas[row.ingredient_id] -= row.amount
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            row = rows.get(ingredient_id)
+            if row is None:
+                deltas[ingredient_id] += amount
+            elif row.amount != amount:
+                deltas[ingredient_id] += amount - row.amount
+                row.amount = amount
+                changed.append(row)
+        if removed:
+            IngredientRecipe.objects.filter(
+                id__in=[row.id for row in removed]
+            )._raw_delete(IngredientRecipe.objects.db)
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        RecipeSerializer.create_or_update(
+            instance,
+            [obj for obj in ingredients if obj['id'] not in rows]
+        )
+        return deltas
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Функция для изменения данных."""
-        ingredients = validated_data.pop('ingredient_recipe')
-        instance.ingredients.clear()
-        self.create_or_update(instance, ingredients)
-        tags = validated_data.pop('tags')
-        instance.tags.set(tags)
+        """Функция для изменения данных.
+
+        Ингредиенты и теги меняются только там, где они отличаются
+        от сохраненных. При частичном изменении (PATCH) незаданные
+        поля остаются прежними, кроме ингредиентов и тегов, которые
+        обязательны по спецификации API.
+        """
+        ingredients = validated_data.pop('ingredient_recipe', None)
+        if ingredients is not None:
+            deltas = self.update_ingredients(instance, ingredients)
+            if any(deltas.values()):
+                ShoppingCartIngredient.objects.apply_amounts(
+                    list(instance.user_cart.values_list('user_id', flat=True)),
+                    deltas
+                )
+        tags = validated_data.pop('tags', None)
+        if tags is not None:
+            instance.tags.set(tags)
         return super().update(instance, validated_data)
 
     def validate(self, data):
@@ -247,7 +374,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Отсутствует поле с тегами'
             )
-        if 'image' not in data:
+        if 'image' not in data and not self.partial:
             raise serializers.ValidationError(
                 'Отсутствует поле с изображением'
             )
@@ -266,11 +393,40 @@ class RecipeSerializer(serializers.ModelSerializer):
                 'Такой ингредиент уже присутствует'
             )
         tags = data['tags']
-        tags = [tag.id for tag in tags]
         if len(tags) != len(set(tags)):
             raise serializers.ValidationError(
                 'Такой тег уже присутствует'
             )
+        return self.resolve_ids(data)
+
+    @staticmethod
+    def resolve_ids(data):
+        """Функция для получения ингредиентов и тегов по id.
+
+        Объекты каждой модели выбираются одним запросом IN
+        и подставляются в данные для create_or_update.
+        """
+        ingredients = Ingredient.objects.in_bulk(
+            [obj['id'] for obj in data['ingredient_recipe']]
+        )
+        tags = Tag.objects.in_bulk(data['tags'])
+        errors = {}
+        missing = [
+            obj['id'] for obj in data['ingredient_recipe']
+            if obj['id'] not in ingredients
+        ]
+        if missing:
+            errors['ingredients'] = [
+                f'Ингредиенты с id {missing} не существуют'
+            ]
+        missing = [tag_id for tag_id in data['tags'] if tag_id not in tags]
+        if missing:
+            errors['tags'] = [f'Теги с id {missing} не существуют']
+        if errors:
+            raise serializers.ValidationError(errors)
+        for obj in data['ingredient_recipe']:
+            obj['ingredient'] = ingredients[obj['id']]
+        data['tags'] = [tags[tag_id] for tag_id in data['tags']]
         return data
 
 
@@ -284,6 +440,9 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     )
     author = UserSerializer(read_only=True)
     image = Base64ImageField(required=False, allow_null=True)
+    image_renditions = ImageRenditionsField(
+        images.RECIPE_RENDITIONS, source='image'
+    )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -293,11 +452,14 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = RecipeSerializer.Meta.fields + (
             'is_favorited',
-            'is_in_shopping_cart'
+            'is_in_shopping_cart',
+            'image_renditions'
         )
 
     def get_is_favorited(self, obj):
         """Функция для получения данных о рецептах в избранном."""
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context['request']
         return (request
                 and request.user.is_authenticated
@@ -307,6 +469,8 @@ class RecipeGetSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Функция для получения данных о рецептах в корзине."""
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context['request']
         return (request
                 and request.user.is_authenticated
@@ -315,9 +479,177 @@ class RecipeGetSerializer(serializers.ModelSerializer):
                 ).exists())
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
+class RecipeFragmentSerializer(RecipeGetSerializer):
+    """Сериализатор общей для всех пользователей части рецепта."""
+
+    author = None
+    is_favorited = None
+    is_in_shopping_cart = None
+
+    class Meta:
+        """Класс определяет метаданные для сериализатора."""
+
+        model = Recipe
+        fields = (
+            'id', 'tags', 'ingredients', 'name', 'image', 'text',
+            'cooking_time', 'image_renditions'
+        )
+
+
+class AuthorCardSerializer(UserSerializer):
+    """Сериализатор общей для всех пользователей части автора."""
+
+    is_subscribed = None
+
+    class Meta:
+        """Класс определяет метаданные для сериализатора."""
+
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name', 'email',
+                  'avatar', 'avatar_renditions')
+
+
+class CachedRecipeListSerializer(serializers.ListSerializer):
+    """Сериализатор списка рецептов из кэша."""
+
+    def to_representation(self, data):
+        """Функция для сборки всей страницы рецептов."""
+        return self.child.render(list(data))
+
+
+class CachedRecipeSerializer(serializers.BaseSerializer):
+    """Сериализатор CachedRecipeSerializer.
+
+    Формирует тот же ответ, что и RecipeGetSerializer, но общая для всех
+    пользователей часть рецепта и карточка автора берутся из кэша.
+    Ключ рецепта содержит время его изменения и версии тегов
+    и ингредиентов, ключ автора содержит версию пользователей,
+    поэтому после изменений старые записи просто перестают читаться.
+    Флаги пользователя берутся из аннотаций with_user_flags.
+    """
+
+    timeout = RECIPE_FRAGMENT_CACHE_TIMEOUT
+
+    class Meta:
+        """Класс определяет метаданные для сериализатора."""
+
+        list_serializer_class = CachedRecipeListSerializer
+
+    def to_representation(self, instance):
+        """Функция для преобразования данных."""
+        return self.render([instance])[0]
+
+    def get_fragments(self, name, keys, serializer_class, queryset):
+        """Функция для получения частей ответа из кэша.
+
+        Отсутствующие в кэше части сериализуются одним запросом
+        для всех объектов и сохраняются в кэш.
+        """
+        fragments = cache.get_many(keys.values())
+        missing = [pk for pk, key in keys.items() if key not in fragments]
+        record_cache(name, len(keys) - len(missing), len(missing))
+        if missing:
+            created = {
+                keys[item['id']]: item
+                for item in serializer_class(
+                    queryset.filter(pk__in=missing),
+                    many=True,
+                    context=self.context
+                ).data
+            }
+            cache.set_many(created, self.timeout)
+            fragments.update(created)
+        return {
+            pk: fragments[key] for pk, key in keys.items() if key in fragments
+        }
+
+    def render(self, recipes):
+        """Функция для сборки рецептов из частей и флагов пользователя."""
+        host = self.context['request'].build_absolute_uri('/')
+        tag_version, ingredient_version, user_version = (
+            DataVersion.objects.stamp(Tag, Ingredient, User)
+        )
+        recipe_fragments = self.get_fragments(
+            'recipe_fragment',
+            {
+                recipe.id: 'recipe:{}:{}:{}:{}:{}'.format(
+                    host, recipe.id, recipe.updated_at.timestamp(),
+                    tag_version, ingredient_version
+                )
+                for recipe in recipes
+            },
+            RecipeFragmentSerializer,
+            Recipe.objects.with_related()
+        )
+        author_cards = self.get_fragments(
+            'author_card',
+            {
+                recipe.author_id: 'author:{}:{}:{}'.format(
+                    host, recipe.author_id, user_version
+                )
+                for recipe in recipes
+            },
+            AuthorCardSerializer,
+            User.objects.all()
+        )
+        data = []
+        for recipe in recipes:
+            if recipe.id not in recipe_fragments:
+                continue
+            fragment = recipe_fragments[recipe.id]
+            author = author_cards[recipe.author_id]
+            flags = {
+                'author': {
+                    field: (
+                        getattr(recipe, 'author_is_subscribed', False)
+                        if field == 'is_subscribed' else author[field]
+                    )
+                    for field in UserSerializer.Meta.fields
+                },
+                'is_favorited': getattr(recipe, 'is_favorited', False),
+                'is_in_shopping_cart': getattr(
+                    recipe, 'is_in_shopping_cart', False
+                )
+            }
+            data.append({
+                field: flags[field] if field in flags else fragment[field]
+                for field in RecipeGetSerializer.Meta.fields
+            })
+        return data
+
+
+class UniqueCreateMixin:
+    """Миксин для добавления записи, уникальность которой проверяет БД.
+
+    Вместо запроса на существование запись сразу добавляется,
+    а нарушение ограничения уникальности превращается в ошибку
+    валидации с сообщением duplicate_message. Счетчики, которые
+    зависят от записи, меняются в той же транзакции.
+    """
+
+    duplicate_message = None
+
+    def change_counts(self, instance, delta):
+        """Функция для изменения счетчиков, зависящих от записи."""
+
+    def create(self, validated_data):
+        """Функция для добавления записи с проверкой уникальности."""
+        try:
+            with transaction.atomic():
+                instance = super().create(validated_data)
+                self.change_counts(instance, 1)
+                return instance
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [self.duplicate_message]}
+            )
+
+
+class FavoriteSerializer(UniqueCreateMixin, serializers.ModelSerializer):
     """Сериализатор FavoriteSerializer."""
 
+    duplicate_message = 'Нельзя добавить в избранное один и тот же рецепт'
+
     class Meta:
         """Класс определяет метаданные для сериализатора."""
 
@@ -329,52 +661,50 @@ class FavoriteSerializer(serializers.ModelSerializer):
         serializer = RecipeMinifiedSerializer(instance.recipe)
         return serializer.data
 
-    def validate(self, data):
-        """Функция для валидации данных."""
-        if Favorite.objects.filter(
-            user=data['user'],
-            recipe=data['recipe']
-        ).exists():
-            raise serializers.ValidationError(
-                'Нельзя добавить в избранное один и тот же рецепт'
-            )
-        return data
+    def change_counts(self, instance, delta):
+        """Функция для изменения счетчика добавлений рецепта."""
+        Recipe.objects.filter(pk=instance.recipe_id).change_count(
+            self.Meta.model.counter_field, delta
+        )
 
 
 class ShoppingCartSerializer(FavoriteSerializer):
     """Сериализатор ShoppingCartSerializer."""
 
+    duplicate_message = 'Нельзя добавить в список покупок один и тот же рецепт'
+
     class Meta(FavoriteSerializer.Meta):
         """Класс определяет метаданные для сериализатора."""
 
         model = ShoppingCart
 
-    def validate(self, data):
-        """Функция для валидации данных."""
-        if ShoppingCart.objects.filter(
-            user=data['user'],
-            recipe=data['recipe']
-        ).exists():
-            raise serializers.ValidationError(
-                'Нельзя добавить в список покупок один и тот же рецепт'
-            )
-        return data
-
 
-class FollowSerializer(serializers.ModelSerializer):
+class FollowSerializer(UniqueCreateMixin, serializers.ModelSerializer):
     """Сериализатор FollowSerializer."""
 
+    duplicate_message = 'Нельзя подписаться еще раз на пользователя'
+
     class Meta:
         """Класс определяет метаданные для сериализатора."""
 
         model = Follow
         fields = ('user', 'following')
 
+    def change_counts(self, instance, delta):
+        """Функция для изменения количества подписчиков."""
+        User.objects.filter(pk=instance.following_id).change_count(
+            'followers_count', delta
+        )
+
     def to_representation(self, instance):
         """Функция для преобразования данных."""
         request = self.context['request']
+        following = UserWithRecipesSerializer.annotate_authors(
+            User.objects.filter(pk=instance.following_id)
+        ).get()
+        UserWithRecipesSerializer.attach_recipes([following], request)
         serializer = UserWithRecipesSerializer(
-            instance.following,
+            following,
             context={'request': request}
         )
         return serializer.data
@@ -385,12 +715,18 @@ class FollowSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Нельзя подписаться на самого себя'
             )
-        follow = Follow.objects.filter(
-            user=data['user'],
-            following=data['following']
-        ).exists()
-        if follow:
-            raise serializers.ValidationError(
-                'Нельзя подписаться еще раз на пользователя'
-            )
         return data
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    """Сериализатор BulkIdsSerializer."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_MAX_IDS
+    )
+
+    def validate_ids(self, value):
+        """Функция для удаления повторов с сохранением порядка."""
+        return list(dict.fromkeys(value))
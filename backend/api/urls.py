@@ -7,7 +7,8 @@ from .views import (
     CustomUserViewSet,
     IngredientViewSet,
     RecipeViewSet,
-    TagViewSet
+    TagViewSet,
+    redirect_to_recipe
 )
 
 
@@ -19,10 +20,11 @@ router_v1.register('users', CustomUserViewSet, basename='users')
 
 urlpatterns = [
     path('', include(router_v1.urls)),
-    path('<str:short_url>/', RecipeViewSet.as_view(
-        {'get': 'redirect_to_recipe'},
+    path(
+        '<str:short_url>/',
+        redirect_to_recipe,
         name='redirect_to_recipe'
-    )),
+    ),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,36 +1,52 @@
 """Представления для работы с моделями приложения API."""
 
-import os
-
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import FileResponse, HttpResponseRedirect
-from django.shortcuts import get_object_or_404
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
 from djoser.views import UserViewSet
 from rest_framework import permissions, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from .filters import IngredientFilter, RecipeFilter
+from .ingredient_index import ingredient_index
+from .mixins import (
+    ConditionalResponseMixin,
+    ProxyCacheMixin,
+    RequestMetricsMixin,
+    SnapshotMixin,
+    get_viewer_stamp
+)
 from .pagination import CustomPagination
 from .permissions import IsAuthorOrReadOnly
+from .renderers import (
+    ShoppingCartContentNegotiation,
+    ShoppingCartCSVRenderer,
+    ShoppingCartPDFRenderer,
+    ShoppingCartTextRenderer
+)
 from .serializers import (
     AvatarSerializer,
+    BulkIdsSerializer,
+    CachedRecipeSerializer,
     UserSerializer,
     FavoriteSerializer,
     FollowSerializer,
     IngredientSerializer,
     RecipeSerializer,
-    RecipeGetSerializer,
     ShoppingCartSerializer,
     TagSerializer,
     UserWithRecipesSerializer
 )
+from foodgram.constants import SHORT_URL_REDIRECT_MAX_AGE
+from recipes import proxy_cache, short_url as short_urls
 from recipes.models import (
-    Favorite, Ingredient, IngredientRecipe,
-    Recipe, ShoppingCart, Tag
+    DataVersion, Favorite, Ingredient, Recipe, ShoppingCart,
+    ShoppingCartIngredient, Tag
 )
 from users.models import Follow
 
@@ -38,7 +54,30 @@ from users.models import Follow
 User = get_user_model()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+def get_bulk_results(ids, found, changed, changed_status):
+    """Функция для получения результата по каждому id пакета.
+
+    Для каждого id возвращается changed_status, если запись изменена,
+    unchanged, если изменять было нечего, и not_found, если объекта нет.
+    """
+    changed = set(changed)
+    return [
+        {
+            'id': item_id,
+            'status': (
+                changed_status if item_id in changed
+                else 'unchanged' if item_id in found
+                else 'not_found'
+            )
+        }
+        for item_id in ids
+    ]
+
+
+class RecipeViewSet(
+    RequestMetricsMixin, ProxyCacheMixin, ConditionalResponseMixin,
+    viewsets.ModelViewSet
+):
     """Класс для обработки данных."""
 
     queryset = Recipe.objects.all()
@@ -49,53 +88,108 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     pagination_class = CustomPagination
-    file_path = None
+    cursor_ordering = ('-created_at', '-id')
+    count_cache_params = ('tags',)
+    personalized = True
+
+    def get_queryset(self):
+        """Функция для получения рецептов с данными для пользователя."""
+        if self.action == 'list' or self.action == 'retrieve':
+            return Recipe.objects.with_user_flags(self.request.user).only(
+                'id', 'author_id', 'created_at', 'updated_at'
+            )
+        return super().get_queryset()
+
+    def get_etag(self, request):
+        """Функция для получения данных для ETag.
+
+        Список зависит от всех рецептов, тегов, ингредиентов и авторов,
+        а также от избранного, корзины и подписок пользователя. Рецепт
+        зависит от своего времени изменения и флагов пользователя.
+        """
+        user = request.user
+        versions = DataVersion.objects.stamp(Tag, Ingredient, User)
+        if self.action == 'list':
+            return (
+                DataVersion.objects.current(Recipe),
+                versions,
+                user.id,
+                get_viewer_stamp(user)
+            )
+        try:
+            pk = Recipe._meta.pk.to_python(self.kwargs['pk'])
+        except ValidationError:
+            return None
+        recipe = Recipe.objects.with_user_flags(user).filter(
+            pk=pk
+        ).values_list(
+            'updated_at', 'is_favorited', 'is_in_shopping_cart',
+            'author_is_subscribed'
+        ).first()
+        if recipe is None:
+            return None
+        self.updated_at = recipe[0]
+        return (pk, recipe, versions, user.id)
+
+    def get_surrogate_keys(self, data):
+        """Функция для получения ключей рецептов, тегов и авторов."""
+        if self.action == 'list':
+            recipes = data['results']
+            keys = [proxy_cache.RECIPES_KEY]
+        else:
+            recipes = [data]
+            keys = []
+        for recipe in recipes:
+            keys.append(proxy_cache.recipe_key(recipe['id']))
+            keys.append(proxy_cache.author_key(recipe['author']['id']))
+            keys.extend(proxy_cache.tag_key(tag['slug'])
+                        for tag in recipe['tags'])
+        return list(dict.fromkeys(keys))
+
+    def get_last_modified(self, request):
+        """Функция для получения времени изменения рецепта."""
+        if self.action != 'retrieve' or request.user.is_authenticated:
+            return None
+        return getattr(self, 'updated_at', None)
 
     def get_serializer_class(self):
         """Функция для изменения сериализатора."""
         if self.action == 'list' or self.action == 'retrieve':
-            return RecipeGetSerializer
+            return CachedRecipeSerializer
         return RecipeSerializer
 
-    @action(detail=False, methods=['get'])
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=[
+            ShoppingCartTextRenderer,
+            ShoppingCartCSVRenderer,
+            ShoppingCartPDFRenderer
+        ],
+        content_negotiation_class=ShoppingCartContentNegotiation
+    )
     def download_shopping_cart(self, request):
         """Функция для того, чтобы скачать список ингредиентов."""
-        user = request.user
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__user_cart__user=user
-        ).values(
-            'ingredient_id'
-        ).annotate(
-            amount=Sum('amount')
+        ingredients = ShoppingCartIngredient.objects.filter(
+            user=request.user
         ).values_list(
             'ingredient__name',
             'ingredient__measurement_unit',
             'amount'
+        ).order_by('ingredient__name')
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients.iterator()),
+            content_type=content_type
         )
-        str_data = ''
-        for name, measurement_unit, amount in ingredients:
-            ingredient = (f'{name} ({measurement_unit}) - {amount}\n')
-            str_data += ingredient
-        self.save_download_shopping_cart(str_data)
-        return FileResponse(open(self.file_path, 'rb'))
-
-    @staticmethod
-    def save_download_shopping_cart(str_data):
-        """Функция для хранения покупок в файле."""
-        folder_path = os.path.join(settings.BASE_DIR, 'download_shopping_cart')
-        os.makedirs(folder_path, exist_ok=True)
-        existing_files = os.listdir(folder_path)
-        if not existing_files:
-            number = '0'
-        else:
-            number = max(
-                [f.split('_')[2].split('.')[0] for f in existing_files]
-            )
-        RecipeViewSet.file_path = os.path.join(
-            folder_path, f'shopping_cart_{str(int(number) + 1)}.txt'
+        response['Content-Disposition'] = (
+            f'attachment; filename="{renderer.filename}"'
         )
-        with open(RecipeViewSet.file_path, 'w', encoding='utf-8') as f:
-            f.write(str_data)
+        return response
 
     @action(
         detail=True,
@@ -121,13 +215,17 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def delete_shopping_cart(self, request, pk=None):
         """Функция для удаления рецепта из корзины."""
         recipe = self.get_object()
-        delete_cnt, _ = ShoppingCart.objects.filter(
-            user=request.user,
-            recipe=recipe
-        ).delete()
-        if not delete_cnt:
-            raise serializers.ValidationError(
-                'Попытка удалить рецепт, которого нет в корзине'
+        with transaction.atomic():
+            delete_cnt, _ = ShoppingCart.objects.filter(
+                user=request.user,
+                recipe=recipe
+            ).delete()
+            if not delete_cnt:
+                raise serializers.ValidationError(
+                    'Попытка удалить рецепт, которого нет в корзине'
+                )
+            Recipe.objects.filter(pk=recipe.pk).change_count(
+                ShoppingCart.counter_field, -1
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -155,16 +253,106 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def delete_favorite(self, request, pk=None):
         """Функция для удаления рецепта из избранного."""
         recipe = self.get_object()
-        delete_cnt, _ = Favorite.objects.filter(
-            user=request.user.id,
-            recipe=recipe
-        ).delete()
-        if not delete_cnt:
-            raise serializers.ValidationError(
-                'Попытка удалить рецепт, которого нет в корзине'
+        with transaction.atomic():
+            delete_cnt, _ = Favorite.objects.filter(
+                user=request.user.id,
+                recipe=recipe
+            ).delete()
+            if not delete_cnt:
+                raise serializers.ValidationError(
+                    'Попытка удалить рецепт, которого нет в корзине'
+                )
+            Recipe.objects.filter(pk=recipe.pk).change_count(
+                Favorite.counter_field, -1
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def add_recipes(self, request, model):
+        """Функция для добавления нескольких рецептов в список.
+
+        Рецепты выбираются одним запросом, записи создаются одним
+        INSERT, который возвращает только действительно добавленные,
+        и счетчики меняются только для них.
+        """
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        found = set(
+            Recipe.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+        with transaction.atomic():
+            created = model.objects.add_relations(
+                request.user.id, 'recipe',
+                [recipe_id for recipe_id in ids if recipe_id in found]
+            )
+            Recipe.objects.filter(id__in=created).change_count(
+                model.counter_field, 1
+            )
+            if model is ShoppingCart and created:
+                ShoppingCartIngredient.objects.apply_amounts(
+                    [request.user.id],
+                    Recipe.objects.filter(id__in=created).ingredient_amounts()
+                )
+        return Response(get_bulk_results(ids, found, created, 'created'))
+
+    def remove_recipes(self, request, model):
+        """Функция для удаления нескольких рецептов из списка.
+
+        Записи удаляются одним DELETE, который возвращает только
+        действительно удаленные, и счетчики меняются только для них.
+        """
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        with transaction.atomic():
+            removed = model.objects.remove_relations(
+                request.user.id, 'recipe', ids
+            )
+            Recipe.objects.filter(id__in=removed).change_count(
+                model.counter_field, -1
+            )
+            if model is ShoppingCart and removed:
+                ShoppingCartIngredient.objects.apply_amounts(
+                    [request.user.id],
+                    {
+                        ingredient_id: -amount
+                        for ingredient_id, amount in Recipe.objects.filter(
+                            id__in=removed
+                        ).ingredient_amounts().items()
+                    }
+                )
+        return Response(get_bulk_results(ids, removed, removed, 'deleted'))
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='batch/shopping_cart',
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        """Функция для добавления нескольких рецептов в корзину."""
+        return self.add_recipes(request, ShoppingCart)
+
+    @shopping_cart_batch.mapping.delete
+    def delete_shopping_cart_batch(self, request):
+        """Функция для удаления нескольких рецептов из корзины."""
+        return self.remove_recipes(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='batch/favorite',
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def favorite_batch(self, request):
+        """Функция для добавления нескольких рецептов в избранное."""
+        return self.add_recipes(request, Favorite)
+
+    @favorite_batch.mapping.delete
+    def delete_favorite_batch(self, request):
+        """Функция для удаления нескольких рецептов из избранного."""
+        return self.remove_recipes(request, Favorite)
+
     @action(
         detail=True,
         methods=['get'],
@@ -177,16 +365,28 @@ class RecipeViewSet(viewsets.ModelViewSet):
         data = {'short-link': short_url}
         return Response(data)
 
-    @staticmethod
-    def redirect_to_recipe(request, short_url):
-        """Функция для перехода к рецепту по короткой ссылке."""
-        instance = get_object_or_404(Recipe, short_url=short_url)
-        url = request.build_absolute_uri().split('/api')[0]
-        short_url = url + f'/recipes/{instance.id}/'
-        return HttpResponseRedirect(short_url)
 
+def redirect_to_recipe(request, short_url):
+    """Функция для перехода к рецепту по короткой ссылке.
+
+    Обычное представление Django без DRF: популярные ссылки
+    берутся из LRU кэша процесса без обращения к БД. Приложение
+    работает под WSGI gunicorn, поэтому представление синхронное.
+    """
+    recipe_id = short_urls.resolve(short_url)
+    if recipe_id is None:
+        raise Http404
+    url = request.build_absolute_uri().split('/api')[0]
+    response = HttpResponseRedirect(url + f'/recipes/{recipe_id}/')
+    patch_cache_control(
+        response, public=True, max_age=SHORT_URL_REDIRECT_MAX_AGE
+    )
+    return response
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(
+    RequestMetricsMixin, SnapshotMixin, viewsets.ReadOnlyModelViewSet
+):
     """Представление для обработки данных."""
 
     queryset = Tag.objects.all()
@@ -194,7 +394,9 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    RequestMetricsMixin, SnapshotMixin, viewsets.ReadOnlyModelViewSet
+):
     """Представление для обработки данных."""
 
     queryset = Ingredient.objects.all()
@@ -203,12 +405,38 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
-
-class CustomUserViewSet(UserViewSet):
+    def list(self, request, *args, **kwargs):
+        """Функция для поиска ингредиентов по индексу в памяти."""
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(request, self.search)
+
+    def get_etag(self, request):
+        """Функция для получения данных для ETag.
+
+        Поиск по названию отвечает из индекса, который отстает от БД
+        на время между проверками версии, поэтому ETag строится по
+        версии самого индекса.
+        """
+        if not request.query_params.get('name'):
+            return super().get_etag(request)
+        self.index_snapshot = ingredient_index.refresh()
+        return ('ingredient_index', self.index_snapshot[0])
+
+    def search(self, request):
+        """Функция для поиска ингредиентов по названию."""
+        return Response(ingredient_index.search(
+            request.query_params['name'], settings.INGREDIENT_SEARCH_LIMIT,
+            self.index_snapshot
+        ))
+
+
+class CustomUserViewSet(RequestMetricsMixin, UserViewSet):
     """Представление для обработки данных."""
 
     serializer_class = UserSerializer
     pagination_class = CustomPagination
+    cursor_ordering = ('username', 'id')
 
     @action(
         detail=False,
@@ -217,8 +445,11 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         """Функция для отображения подписчиков."""
-        queryset = User.objects.filter(followers__user=request.user)
+        queryset = UserWithRecipesSerializer.annotate_authors(
+            User.objects.filter(followers__user=request.user)
+        ).order_by('username')
         page = self.paginate_queryset(queryset)
+        UserWithRecipesSerializer.attach_recipes(page, request)
         serializer = self.get_serializer(page, many=True)
         return self.get_paginated_response(serializer.data)
 
@@ -249,16 +480,64 @@ class CustomUserViewSet(UserViewSet):
     def delete_subscribe(self, request, id=None):
         """Функция для отписки на пользователя."""
         following = self.get_object()
-        delete_cnt, _ = Follow.objects.filter(
-            user=request.user,
-            following=following
-        ).delete()
-        if not delete_cnt:
-            raise serializers.ValidationError(
-                'Вы пытаетесь удалить несуществующую подписку'
+        with transaction.atomic():
+            delete_cnt, _ = Follow.objects.filter(
+                user=request.user,
+                following=following
+            ).delete()
+            if not delete_cnt:
+                raise serializers.ValidationError(
+                    'Вы пытаетесь удалить несуществующую подписку'
+                )
+            User.objects.filter(pk=following.pk).change_count(
+                'followers_count', -1
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='batch/subscribe',
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def subscribe_batch(self, request):
+        """Функция для подписки на нескольких пользователей.
+
+        Пользователи выбираются одним запросом, подписки создаются
+        одним INSERT, который возвращает только действительно
+        добавленные, и счетчики меняются только для них.
+        """
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        found = set(User.objects.filter(id__in=ids).exclude(
+            id=request.user.id
+        ).values_list('id', flat=True))
+        with transaction.atomic():
+            created = Follow.objects.add_relations(
+                request.user.id, 'following',
+                [user_id for user_id in ids if user_id in found]
+            )
+            User.objects.filter(id__in=created).change_count(
+                'followers_count', 1
+            )
+        return Response(get_bulk_results(ids, found, created, 'created'))
+
+    @subscribe_batch.mapping.delete
+    def delete_subscribe_batch(self, request):
+        """Функция для отписки от нескольких пользователей."""
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        with transaction.atomic():
+            removed = Follow.objects.remove_relations(
+                request.user.id, 'following', ids
+            )
+            User.objects.filter(id__in=removed).change_count(
+                'followers_count', -1
+            )
+        return Response(get_bulk_results(ids, removed, removed, 'deleted'))
+
     @action(
         detail=False,
         methods=['put'],
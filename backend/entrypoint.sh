@@ -0,0 +1,12 @@
+#!/bin/sh
+# Каждый контейнер пишет метрики Prometheus в свой подкаталог общего
+# тома: номера процессов разных контейнеров совпадают, а файлы
+# прошлого запуска удаляются до старта gunicorn или run_tasks.
+set -e
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    export PROMETHEUS_MULTIPROC_ROOT="$PROMETHEUS_MULTIPROC_DIR"
+    export PROMETHEUS_MULTIPROC_DIR="$PROMETHEUS_MULTIPROC_ROOT/$(hostname)"
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+exec "$@"
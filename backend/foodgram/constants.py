@@ -1,13 +1,55 @@
 """Константы для проекта."""
 
-CHARACTERS = ('abcdefghijklmnopqrs '
-              'tuvwxyz0123456789')
+ADMIN_INLINE_MAX_ROWS = 50
+BULK_MAX_IDS = 100
+CACHE_MAX_ENTRIES = 10_000
+COUNT_CACHE_TIMEOUT = 60 * 60
 CREATE_USER_MAX_LENGTH = 150
+DATA_VERSION_NAME_MAX_LENGTH = 64
+ESTIMATED_COUNT_THRESHOLD = 1_000_000
+IMAGE_AVATAR_SIZE = (128, 128)
+IMAGE_CARD_SIZE = (480, 320)
+IMAGE_DETAIL_SIZE = (1200, 800)
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_MAX_SIDE = 10_000
+IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+IMAGE_RENDITIONS_CACHE_TIMEOUT = 60 * 60 * 24
+IMAGE_RENDITION_QUALITY = 80
+IMAGE_WORKERS = 2
+INGREDIENT_INDEX_CHECK_INTERVAL = 5
 INGREDIENT_NAME_MAX_LENGTH = 128
+INGREDIENT_SEARCH_LIMIT = 50
 INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH = 64
 MIN_VALUE_VALIDATOR = 1
+MAX_PAGE_SIZE = 100
 MAX_VALUE_VALIDATOR = 32_000
 PAGE_SIZE = 6
+PROXY_CACHE_LIST_MAX_AGE = 30
+PROXY_CACHE_MAX_AGE = 60 * 60
+PROXY_CACHE_REFRESH_TIMEOUT = 2
+RECIPE_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
 RECIPE_NAME_MAX_LENGTH = 256
+RECIPE_SEARCH_CONFIG = 'russian'
 RECIPE_SHORT_URL_MAX_LENGTH = 10
+REQUEST_FINGERPRINTS_LIMIT = 5
+REQUEST_MAX_DURATION = 500
+REQUEST_MAX_QUERIES = 30
+SHORT_URL_ALPHABET = ('0123456789'
+                      'abcdefghijklmnopqrstuvwxyz'
+                      'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+SHORT_URL_BITS = 40
+SHORT_URL_CACHE_SIZE = 10_000
+SHORT_URL_CACHE_TIMEOUT = 60 * 60 * 24
+SHORT_URL_LENGTH = 7
+SHORT_URL_MULTIPLIERS = (0x9E3779B97F, 0xC2B2AE3D27)
+SHORT_URL_REDIRECT_MAX_AGE = 60 * 60
+SNAPSHOT_MAX_AGE = 60 * 60 * 24
 TAG_MAX_LENGTH = 32
+TASK_BACKOFF = 10
+TASK_MAX_ATTEMPTS = 5
+TASK_NAME_MAX_LENGTH = 256
+TASK_POLL_INTERVAL = 1
+TASK_RETENTION = 60 * 60 * 24
+TASK_STATUS_MAX_LENGTH = 16
+TASK_TIMEOUT = 60 * 10
+TASK_WORKERS = 4
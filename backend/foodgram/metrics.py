@@ -0,0 +1,201 @@
+"""Замеры запросов к БД и времени обработки запросов.
+
+RequestMetricsMiddleware на время запроса подключает к каждому
+соединению с БД обертку execute_wrapper, которая считает запросы
+и их время. Итоги отдаются в заголовке Server-Timing и пишутся
+в лог одной JSON строкой, а для медленных запросов или запросов
+с большим числом обращений к БД в лог добавляются отпечатки SQL.
+Те же замеры накапливаются в гистограммах Prometheus по маршрутам.
+"""
+
+import json
+import logging
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from .constants import REQUEST_FINGERPRINTS_LIMIT
+from .prometheus import (
+    REQUEST_DB_DURATION,
+    REQUEST_DB_QUERIES,
+    REQUEST_DURATION
+)
+
+
+logger = logging.getLogger('foodgram.requests')
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+FINGERPRINT_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%s|\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    """Функция для получения отпечатка SQL без значений параметров."""
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class RequestMetrics:
+    """Замеры одного запроса.
+
+    Экземпляр передается в execute_wrapper и сохраняет только текст
+    и время запросов к БД. Отпечатки считаются уже после ответа
+    и только для запросов, превысивших пороги.
+    """
+
+    def __init__(self):
+        """Функция для начала замеров."""
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = []
+        self.handler_started = None
+        self.handler_db_time = 0.0
+        self.serializer_time = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Функция для выполнения запроса к БД с замером времени."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.db_time += duration
+            self.queries.append((sql, duration))
+
+    def start_handler(self):
+        """Функция для начала замера обработчика представления."""
+        self.handler_started = time.perf_counter()
+        self.handler_db_time = self.db_time
+
+    def stop_handler(self):
+        """Функция для окончания замера обработчика представления.
+
+        Из времени обработчика вычитается время запросов к БД,
+        остается в основном проверка и сериализация данных.
+        """
+        if self.handler_started is None:
+            return
+        self.serializer_time = (
+            time.perf_counter() - self.handler_started
+            - (self.db_time - self.handler_db_time)
+        )
+
+    def get_fingerprints(self, limit=REQUEST_FINGERPRINTS_LIMIT):
+        """Функция для получения самых долгих отпечатков SQL."""
+        totals = defaultdict(lambda: [0, 0.0])
+        for sql, duration in self.queries:
+            total = totals[fingerprint(sql)]
+            total[0] += 1
+            total[1] += duration
+        top = sorted(totals.items(), key=lambda item: -item[1][1])[:limit]
+        return [
+            {'sql': sql, 'count': count, 'db_ms': round(duration * 1000, 1)}
+            for sql, (count, duration) in top
+        ]
+
+
+class RequestMetricsMiddleware:
+    """Промежуточный слой для замеров запросов к БД и времени ответа."""
+
+    def __init__(self, get_response):
+        """Функция для создания промежуточного слоя."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Функция для обработки запроса с замерами."""
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        total_time = time.perf_counter() - metrics.started
+        self.observe(request, response, metrics, total_time)
+        if settings.SERVER_TIMING and self.is_staff(request):
+            response['Server-Timing'] = self.get_server_timing(
+                metrics, total_time
+            )
+        self.log(request, response, metrics, total_time)
+        return response
+
+    @staticmethod
+    def is_staff(request):
+        """Функция для проверки, что запрос сделан сотрудником.
+
+        Заголовок Server-Timing раскрывает число и время запросов к БД,
+        поэтому отдается только сотрудникам. Пользователя из токена
+        DRF переносит в исходный запрос Django.
+        """
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def get_server_timing(self, metrics, total_time):
+        """Функция для формирования заголовка Server-Timing."""
+        timings = [
+            'db;dur={:.1f};desc="{} queries"'.format(
+                metrics.db_time * 1000, len(metrics.queries)
+            )
+        ]
+        if metrics.serializer_time is not None:
+            timings.append(
+                f'serializer;dur={metrics.serializer_time * 1000:.1f}'
+            )
+        timings.append(f'total;dur={total_time * 1000:.1f}')
+        return ', '.join(timings)
+
+    def get_view_name(self, request):
+        """Функция для получения имени маршрута запроса."""
+        match = request.resolver_match
+        return match.view_name if match else None
+
+    def observe(self, request, response, metrics, total_time):
+        """Функция для добавления замеров в гистограммы Prometheus."""
+        view = self.get_view_name(request) or 'unmatched'
+        REQUEST_DURATION.labels(
+            view, request.method, response.status_code
+        ).observe(total_time)
+        REQUEST_DB_QUERIES.labels(view).observe(len(metrics.queries))
+        REQUEST_DB_DURATION.labels(view).observe(metrics.db_time)
+
+    def log(self, request, response, metrics, total_time):
+        """Функция для записи замеров в лог.
+
+        Запросы сверх порогов REQUEST_MAX_QUERIES и
+        REQUEST_MAX_DURATION пишутся с уровнем WARNING
+        вместе с самыми долгими отпечатками SQL.
+        """
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': self.get_view_name(request),
+            'status': response.status_code,
+            'queries': len(metrics.queries),
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'serializer_ms': (
+                round(metrics.serializer_time * 1000, 1)
+                if metrics.serializer_time is not None else None
+            ),
+            'total_ms': round(total_time * 1000, 1),
+        }
+        if (
+            record['queries'] > settings.REQUEST_MAX_QUERIES
+            or record['total_ms'] > settings.REQUEST_MAX_DURATION
+        ):
+            record['fingerprints'] = metrics.get_fingerprints()
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,94 @@
+"""Метрики Prometheus для API.
+
+Если задана переменная окружения PROMETHEUS_MULTIPROC_DIR, каждый
+процесс gunicorn и обработчика задач пишет значения в свои файлы
+в этом каталоге, а /metrics суммирует файлы всех процессов. В docker
+compose entrypoint.sh отводит каждому контейнеру свой подкаталог
+общего тома PROMETHEUS_MULTIPROC_ROOT и очищает его при запуске,
+а /metrics суммирует файлы всех подкаталогов. Адрес /metrics
+не проксируется nginx и доступен только из внутренней сети.
+"""
+
+import glob
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время ответа на запрос',
+    ['view', 'method', 'status']
+)
+REQUEST_DB_QUERIES = Histogram(
+    'foodgram_request_db_queries',
+    'Количество запросов к БД за один запрос',
+    ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200)
+)
+REQUEST_DB_DURATION = Histogram(
+    'foodgram_request_db_duration_seconds',
+    'Время запросов к БД за один запрос',
+    ['view']
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Обращения к кэшам',
+    ['cache', 'result']
+)
+IMAGE_RENDER_DURATION = Histogram(
+    'foodgram_image_render_duration_seconds',
+    'Время создания копий изображения',
+    ['renditions'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+
+def record_cache(name, hits=0, misses=0):
+    """Функция для учета попаданий и промахов кэша."""
+    if hits:
+        CACHE_REQUESTS.labels(name, 'hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(name, 'miss').inc(misses)
+
+
+class ContainersCollector:
+    """Сборщик метрик из подкаталогов всех контейнеров."""
+
+    def __init__(self, path):
+        """Функция для создания сборщика для общего каталога."""
+        self.path = path
+
+    def collect(self):
+        """Функция для суммирования файлов метрик всех процессов."""
+        return multiprocess.MultiProcessCollector.merge(
+            glob.glob(os.path.join(self.path, '*', '*.db')),
+            accumulate=True
+        )
+
+
+def metrics(request):
+    """Функция для отдачи метрик в текстовом формате Prometheus."""
+    if settings.PROMETHEUS_MULTIPROC_ROOT:
+        registry = CollectorRegistry()
+        registry.register(
+            ContainersCollector(settings.PROMETHEUS_MULTIPROC_ROOT)
+        )
+    elif settings.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -6,7 +6,17 @@ from pathlib import Path
 from dotenv import load_dotenv
 from django.core.management.utils import get_random_secret_key
 
-from .constants import PAGE_SIZE
+from .constants import (
+    CACHE_MAX_ENTRIES,
+    IMAGE_WORKERS,
+    INGREDIENT_INDEX_CHECK_INTERVAL,
+    INGREDIENT_SEARCH_LIMIT,
+    PAGE_SIZE,
+    REQUEST_MAX_DURATION,
+    REQUEST_MAX_QUERIES,
+    TASK_TIMEOUT,
+    TASK_WORKERS
+)
 
 
 load_dotenv()
@@ -37,6 +47,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'drf_yasg',
     'rest_framework',
     'django_filters',
@@ -46,10 +57,12 @@ INSTALLED_APPS = [
     'api',
     'recipes',
     'users',
+    'tasks',
     'django_extensions'
 ]
 
 MIDDLEWARE = [
+    'foodgram.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -98,6 +111,22 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', '')
+    }
+}
+
+if CACHES['default']['BACKEND'].endswith('.LocMemCache'):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': CACHE_MAX_ENTRIES}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -153,6 +182,63 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+INGREDIENT_SEARCH_LIMIT = int(
+    os.getenv('INGREDIENT_SEARCH_LIMIT', INGREDIENT_SEARCH_LIMIT)
+)
+
+INGREDIENT_INDEX_CHECK_INTERVAL = float(
+    os.getenv('INGREDIENT_INDEX_CHECK_INTERVAL', INGREDIENT_INDEX_CHECK_INTERVAL)
+)
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', IMAGE_WORKERS))
+
+TASK_WORKERS = int(os.getenv('TASK_WORKERS', TASK_WORKERS))
+
+TASK_TIMEOUT = int(os.getenv('TASK_TIMEOUT', TASK_TIMEOUT))
+
+PROXY_CACHE_URLS = [
+    url for url in os.getenv('PROXY_CACHE_URLS', '').split(',') if url
+]
+
+PROXY_CACHE_HOST = os.getenv('PROXY_CACHE_HOST', '')
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', '')
+
+PROMETHEUS_MULTIPROC_ROOT = os.getenv('PROMETHEUS_MULTIPROC_ROOT', '')
+
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'False') == 'True'
+
+REQUEST_MAX_QUERIES = int(
+    os.getenv('REQUEST_MAX_QUERIES', REQUEST_MAX_QUERIES)
+)
+
+REQUEST_MAX_DURATION = float(
+    os.getenv('REQUEST_MAX_DURATION', REQUEST_MAX_DURATION)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'foodgram.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication'
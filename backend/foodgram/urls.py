@@ -5,10 +5,13 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .prometheus import metrics
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -1,32 +1,90 @@
 """Админ-зона для API."""
 
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
 
+from api.pagination import EstimatedCountPaginator
+from foodgram.constants import ADMIN_INLINE_MAX_ROWS
 from .models import (
     Favorite, Ingredient, IngredientRecipe,
     Recipe, ShoppingCart, Tag
 )
 
 
+class IngredientRecipeInline(admin.TabularInline):
+    """Класс для редактирования ингредиентов на странице рецепта.
+
+    Ингредиенты выбираются поиском, а не списком всех ингредиентов,
+    поэтому виджет загружает только выбранные в строках значения.
+    """
+
+    model = IngredientRecipe
+    autocomplete_fields = ['ingredient']
+    extra = 0
+
+    def get_queryset(self, request):
+        """Функция для подгрузки рецепта и ингредиентов строк."""
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient'
+        ).defer('recipe__search_vector')
+
+
 class RecipeAdmin(admin.ModelAdmin):
     """Класс для управление админ-зоной."""
 
     list_display = [
         'name',
         'author',
-        'favorites_count_display'
+        'favorites_count',
+        'in_carts_count'
     ]
+    list_select_related = ['author']
+    readonly_fields = ['favorites_count', 'in_carts_count', 'ingredient_rows']
     search_fields = [
         'name',
-        'author'
+        '=author__username',
+        '=author__email'
     ]
     list_filter = ['tags']
+    autocomplete_fields = ['author', 'tags']
+    inlines = [IngredientRecipeInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
-    def favorites_count_display(self, obj):
-        """Функция для отображения количества рецептов в избранном."""
-        return obj.user_favorite.count()
+    def get_queryset(self, request):
+        """Функция для получения рецептов без поискового вектора."""
+        return super().get_queryset(request).defer('search_vector')
 
-    favorites_count_display.short_description = 'Добавлений в избранное'
+    @staticmethod
+    def get_ingredients_count(obj):
+        """Функция для получения количества ингредиентов рецепта."""
+        if not hasattr(obj, 'ingredients_count'):
+            obj.ingredients_count = obj.ingredient_recipe.count()
+        return obj.ingredients_count
+
+    def get_inline_instances(self, request, obj=None):
+        """Функция для получения встроенных форм страницы рецепта.
+
+        Если у рецепта больше ADMIN_INLINE_MAX_ROWS ингредиентов,
+        строки не выводятся на странице, а редактируются в списке
+        ингредиентов рецепта с постраничным выводом.
+        """
+        if (obj is not None
+                and self.get_ingredients_count(obj) > ADMIN_INLINE_MAX_ROWS):
+            return []
+        return super().get_inline_instances(request, obj)
+
+    @admin.display(description='Ингредиенты')
+    def ingredient_rows(self, obj):
+        """Функция для ссылки на список ингредиентов рецепта."""
+        if obj.pk is None:
+            return '-'
+        url = reverse('admin:recipes_ingredientrecipe_changelist')
+        return format_html(
+            '<a href="{}?recipe__id__exact={}">Ингредиентов: {}</a>',
+            url, obj.pk, self.get_ingredients_count(obj)
+        )
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -34,11 +92,41 @@ class IngredientAdmin(admin.ModelAdmin):
 
     list_display = ['name', 'measurement_unit']
     search_fields = ['name']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class TagAdmin(admin.ModelAdmin):
+    """Класс для управление админ-зоной."""
+
+    list_display = ['name', 'slug']
+    search_fields = ['name', 'slug']
+
+
+class IngredientRecipeAdmin(admin.ModelAdmin):
+    """Класс для управление админ-зоной."""
+
+    list_display = ['recipe', 'ingredient', 'amount']
+    list_select_related = ['recipe', 'ingredient']
+    autocomplete_fields = ['recipe', 'ingredient']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class FavoriteAdmin(admin.ModelAdmin):
+    """Класс для управление админ-зоной."""
+
+    list_display = ['user', 'recipe']
+    list_select_related = ['user', 'recipe']
+    search_fields = ['=user__username', '=user__email']
+    autocomplete_fields = ['user', 'recipe']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
-admin.site.register(Tag)
-admin.site.register(IngredientRecipe)
-admin.site.register(Favorite)
-admin.site.register(ShoppingCart)
+admin.site.register(Tag, TagAdmin)
+admin.site.register(IngredientRecipe, IngredientRecipeAdmin)
+admin.site.register(Favorite, FavoriteAdmin)
+admin.site.register(ShoppingCart, FavoriteAdmin)
@@ -9,3 +9,7 @@ class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Каталог рецептов'
+
+    def ready(self):
+        """Функция для подключения обработчиков сигналов."""
+        from . import signals  # noqa: F401
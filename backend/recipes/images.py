@@ -0,0 +1,192 @@
+"""Проверка загруженных изображений и создание их уменьшенных копий.
+
+Копии создаются фоновой задачей в отдельных процессах и сохраняются
+рядом с оригиналом в каталоге renditions под именами, которые
+вычисляются по имени оригинала, поэтому хранить их в БД не нужно.
+Какие копии уже готовы, запоминается в кэше, чтобы не проверять
+файлы в хранилище при каждой сериализации. Модуль не использует
+модели Django, потому что импортируется в процессах пула,
+запущенных через spawn.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image, ImageOps
+
+from foodgram.constants import (
+    IMAGE_AVATAR_SIZE,
+    IMAGE_CARD_SIZE,
+    IMAGE_DETAIL_SIZE,
+    IMAGE_MAX_PIXELS,
+    IMAGE_MAX_SIDE,
+    IMAGE_RENDITIONS_CACHE_TIMEOUT,
+    IMAGE_RENDITION_QUALITY
+)
+from foodgram.prometheus import IMAGE_RENDER_DURATION, record_cache
+
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+RENDITIONS = {
+    'avatar': (IMAGE_AVATAR_SIZE, True),
+    'card': (IMAGE_CARD_SIZE, True),
+    'detail': (IMAGE_DETAIL_SIZE, False),
+}
+RECIPE_RENDITIONS = ('card', 'detail')
+AVATAR_RENDITIONS = ('avatar',)
+
+executor = None
+executor_lock = threading.Lock()
+
+
+def get_formats():
+    """Функция для получения форматов копий, доступных в Pillow."""
+    Image.init()
+    return tuple(
+        format for format in ('avif', 'webp')
+        if format.upper() in Image.SAVE
+    )
+
+
+def check_dimensions(file):
+    """Функция для проверки размеров изображения по его заголовку."""
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+    finally:
+        file.seek(0)
+    return (
+        width <= IMAGE_MAX_SIDE
+        and height <= IMAGE_MAX_SIDE
+        and width * height <= IMAGE_MAX_PIXELS
+    )
+
+
+def rendition_name(name, rendition, format):
+    """Функция для получения имени копии изображения."""
+    directory, file_name = os.path.split(name)
+    stem = os.path.splitext(file_name)[0]
+    return os.path.join(
+        directory, 'renditions', f'{stem}_{rendition}.{format}'
+    )
+
+
+def render(source, targets):
+    """Функция для создания копий изображения в процессе пула."""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        for path, size, crop, format in targets:
+            if crop:
+                copy = ImageOps.fit(image, size)
+            else:
+                copy = image.copy()
+                copy.thumbnail(size)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f'{path}.tmp'
+            copy.save(
+                temporary,
+                format=format.upper(),
+                quality=IMAGE_RENDITION_QUALITY
+            )
+            os.replace(temporary, path)
+
+
+def get_executor():
+    """Функция для получения пула процессов текущего процесса."""
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+    return executor
+
+
+def get_targets(field_file, renditions):
+    """Функция для получения недостающих копий изображения."""
+    formats = get_formats()
+    if not field_file:
+        return []
+    storage = field_file.storage
+    targets = [
+        (
+            storage.path(rendition_name(field_file.name, rendition, format)),
+            *RENDITIONS[rendition],
+            format
+        )
+        for rendition in renditions
+        for format in formats
+    ]
+    return [target for target in targets if not os.path.exists(target[0])]
+
+
+def make_renditions(field_file, renditions):
+    """Функция для создания недостающих копий в пуле процессов."""
+    targets = get_targets(field_file, renditions)
+    if not targets:
+        return False
+    with IMAGE_RENDER_DURATION.labels(','.join(renditions)).time():
+        get_executor().submit(
+            render, field_file.storage.path(field_file.name), targets
+        ).result()
+    return True
+
+
+def get_renditions_key(field_file, renditions):
+    """Функция для получения ключа кэша готовых копий изображения."""
+    return 'renditions:{}:{}'.format(field_file.name, ','.join(renditions))
+
+
+def get_ready_renditions(field_file, renditions):
+    """Функция для получения имен готовых копий изображения.
+
+    Кэшируется только полный набор: имя оригинала меняется вместе
+    с изображением, поэтому готовые копии не устаревают. Пока фоновая
+    задача создает копии, файлы проверяются в хранилище.
+    """
+    key = get_renditions_key(field_file, renditions)
+    names = cache.get(key)
+    if names is not None:
+        record_cache('renditions', hits=1)
+        return names
+    record_cache('renditions', misses=1)
+    storage = field_file.storage
+    formats = get_formats()
+    names = {}
+    for rendition in renditions:
+        for format in formats:
+            name = rendition_name(field_file.name, rendition, format)
+            if storage.exists(name):
+                names.setdefault(rendition, {})[format] = name
+    if sum(map(len, names.values())) == len(renditions) * len(formats):
+        cache.set(key, names, IMAGE_RENDITIONS_CACHE_TIMEOUT)
+    return names
+
+
+def get_rendition_urls(field_file, renditions):
+    """Функция для получения адресов созданных копий изображения."""
+    if not field_file:
+        return {}
+    storage = field_file.storage
+    return {
+        rendition: {
+            format: storage.url(name) for format, name in formats.items()
+        }
+        for rendition, formats in get_ready_renditions(
+            field_file, renditions
+        ).items()
+    }
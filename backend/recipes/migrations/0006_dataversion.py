@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-17 04:25
+
+from django.db import migrations, models
+
+
+def create_data_versions(apps, schema_editor):
+    DataVersion = apps.get_model('recipes', 'DataVersion')
+    DataVersion.objects.bulk_create([
+        DataVersion(name='recipes.ingredient', version=1),
+        DataVersion(name='recipes.tag', version=1),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_shoppingcartingredient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Модель')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'версию данных',
+                'verbose_name_plural': 'Версии данных',
+            },
+        ),
+        migrations.RunPython(
+            create_data_versions, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 3.2 on 2026-10-17 04:45
+
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def get_duplicates(model, fields):
+    return model.objects.values(*fields).annotate(
+        keep=Min('id'), total=Count('id')
+    ).filter(total__gt=1).order_by()
+
+
+def remove_duplicates(apps, schema_editor):
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient'
+    )
+
+    for row in get_duplicates(IngredientRecipe, ('recipe', 'ingredient')):
+        rows = IngredientRecipe.objects.filter(
+            recipe=row['recipe'], ingredient=row['ingredient']
+        )
+        IngredientRecipe.objects.filter(id=row['keep']).update(
+            amount=rows.aggregate(amount=Sum('amount'))['amount']
+        )
+        rows.exclude(id=row['keep']).delete()
+
+    for row in get_duplicates(Favorite, ('user', 'recipe')):
+        Favorite.objects.filter(
+            user=row['user'], recipe=row['recipe']
+        ).exclude(id=row['keep']).delete()
+
+    user_ids = set()
+    for row in get_duplicates(ShoppingCart, ('user', 'recipe')):
+        ShoppingCart.objects.filter(
+            user=row['user'], recipe=row['recipe']
+        ).exclude(id=row['keep']).delete()
+        user_ids.add(row['user'])
+    if not user_ids:
+        return
+    ShoppingCartIngredient.objects.filter(user__in=user_ids).delete()
+    totals = IngredientRecipe.objects.filter(
+        recipe__user_cart__user__in=user_ids
+    ).values(
+        'recipe__user_cart__user', 'ingredient'
+    ).annotate(
+        total=Sum('amount')
+    ).values_list(
+        'recipe__user_cart__user', 'ingredient', 'total'
+    ).order_by()
+    ShoppingCartIngredient.objects.bulk_create(
+        [
+            ShoppingCartIngredient(
+                user_id=user_id, ingredient_id=ingredient_id, amount=total
+            )
+            for user_id, ingredient_id, total in totals.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicates, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,149 @@
+# Generated by Django 3.2 on 2026-10-17 04:45
+
+from importlib import import_module
+
+from django.db import migrations, models, transaction
+
+
+CONSTRAINTS = (
+    ('favorite', 'user_favorite_recipe_unique', ('user', 'recipe')),
+    ('shoppingcart', 'user_cart_recipe_unique', ('user', 'recipe')),
+    ('ingredientrecipe', 'recipe_ingredient_unique', ('recipe', 'ingredient')),
+)
+
+INDEXES = (
+    ('recipe', 'recipe_created_at_id_idx', ('-created_at', '-id')),
+)
+
+
+def get_columns(schema_editor, model, fields):
+    columns = []
+    for field in fields:
+        column = schema_editor.quote_name(
+            model._meta.get_field(field.lstrip('-')).column
+        )
+        columns.append(f'{column} DESC' if field.startswith('-') else column)
+    return ', '.join(columns)
+
+
+def get_index_state(schema_editor, name):
+    # Возвращает (индекс валиден, ограничение существует) или None,
+    # если индекса нет.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT i.indisvalid, EXISTS ('
+            '    SELECT 1 FROM pg_constraint WHERE conindid = i.indexrelid'
+            ') FROM pg_index i WHERE i.indexrelid = to_regclass(%s)',
+            [name]
+        )
+        return cursor.fetchone()
+
+
+def create_index(schema_editor, model, name, fields, unique):
+    # На PostgreSQL индексы строятся без блокировки записи в таблицы,
+    # а уникальный индекс затем становится ограничением таблицы.
+    # Неудачный CREATE INDEX CONCURRENTLY оставляет невалидный индекс,
+    # который IF NOT EXISTS пропустил бы при повторном запуске,
+    # поэтому такой индекс сначала удаляется.
+    postgresql = schema_editor.connection.vendor == 'postgresql'
+    table = schema_editor.quote_name(model._meta.db_table)
+    state = get_index_state(schema_editor, name) if postgresql else None
+    quoted_name = schema_editor.quote_name(name)
+    if state is not None and not state[0]:
+        schema_editor.execute(
+            f'DROP INDEX CONCURRENTLY IF EXISTS {quoted_name}'
+        )
+        state = None
+    if state is None:
+        schema_editor.execute(
+            'CREATE {}INDEX {}{} ON {} ({})'.format(
+                'UNIQUE ' if unique else '',
+                'CONCURRENTLY IF NOT EXISTS ' if postgresql else '',
+                quoted_name,
+                table,
+                get_columns(schema_editor, model, fields)
+            )
+        )
+    if unique and postgresql and not (state and state[1]):
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {quoted_name} '
+            f'UNIQUE USING INDEX {quoted_name}'
+        )
+
+
+def drop_index(schema_editor, model, name, unique):
+    table = schema_editor.quote_name(model._meta.db_table)
+    name = schema_editor.quote_name(name)
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.execute(
+            schema_editor.sql_delete_index % {'table': table, 'name': name}
+        )
+    elif unique:
+        schema_editor.execute(
+            f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}'
+        )
+    else:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def create_constraints(apps, schema_editor):
+    # Повторы могли появиться после 0010, пока индексы еще не построены,
+    # и тогда построение уникального индекса завершится ошибкой.
+    with transaction.atomic(using=schema_editor.connection.alias):
+        import_module(
+            'recipes.migrations.0010_remove_duplicates'
+        ).remove_duplicates(apps, schema_editor)
+    for model_name, name, fields in CONSTRAINTS:
+        model = apps.get_model('recipes', model_name)
+        create_index(schema_editor, model, name, fields, unique=True)
+    for model_name, name, fields in INDEXES:
+        model = apps.get_model('recipes', model_name)
+        create_index(schema_editor, model, name, fields, unique=False)
+
+
+def drop_constraints(apps, schema_editor):
+    for model_name, name, fields in INDEXES:
+        model = apps.get_model('recipes', model_name)
+        drop_index(schema_editor, model, name, unique=False)
+    for model_name, name, fields in CONSTRAINTS:
+        model = apps.get_model('recipes', model_name)
+        drop_index(schema_editor, model, name, unique=True)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0010_remove_duplicates'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ('-created_at', '-id'), 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_constraints, drop_constraints),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=models.Index(fields=['-created_at', '-id'], name='recipe_created_at_id_idx'),
+                ),
+                migrations.AddConstraint(
+                    model_name='favorite',
+                    constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='user_favorite_recipe_unique'),
+                ),
+                migrations.AddConstraint(
+                    model_name='ingredientrecipe',
+                    constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='recipe_ingredient_unique'),
+                ),
+                migrations.AddConstraint(
+                    model_name='shoppingcart',
+                    constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='user_cart_recipe_unique'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2 on 2026-10-17 04:50
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+COUNTERS = (
+    ('recipes', 'Recipe', 'favorites_count', 'recipes', 'Favorite', 'recipe'),
+    ('recipes', 'Recipe', 'in_carts_count', 'recipes', 'ShoppingCart', 'recipe'),
+    ('users', 'CreateUser', 'recipes_count', 'recipes', 'Recipe', 'author'),
+    ('users', 'CreateUser', 'followers_count', 'users', 'Follow', 'following'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, model_name, field, related_app, related_name, fk in COUNTERS:
+        model = apps.get_model(app, model_name)
+        related_model = apps.get_model(related_app, related_name)
+        total = related_model.objects.filter(
+            **{fk: OuterRef('pk')}
+        ).order_by().values(fk).annotate(total=Count('pk')).values('total')
+        model.objects.update(**{
+            field: Coalesce(Subquery(total), 0)
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_createuser_counters'),
+        ('recipes', '0011_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в корзину'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
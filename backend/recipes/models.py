@@ -1,13 +1,18 @@
 """Модели для создания БД."""
 
-from random import choices
-
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import (
+    BooleanField, Case, Exists, F, IntegerField, OuterRef, Prefetch, Sum,
+    Value, When, Window
+)
+from django.db.models.functions import RowNumber
 from django.contrib.auth import get_user_model
+from django.core.exceptions import EmptyResultSet
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 from foodgram.constants import (
-    CHARACTERS,
+    DATA_VERSION_NAME_MAX_LENGTH,
     INGREDIENT_NAME_MAX_LENGTH,
     INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH,
     MIN_VALUE_VALIDATOR,
@@ -17,11 +22,64 @@ from foodgram.constants import (
     TAG_MAX_LENGTH,
 
 )
+from users.models import CounterQuerySet, Follow, RelationQuerySet
+from .short_url import encode as encode_short_url
 
 
 User = get_user_model()
 
 
+class DataVersionQuerySet(models.QuerySet):
+    """Класс набора запросов для модели DataVersion."""
+
+    def current(self, model):
+        """Функция для получения текущей версии данных модели."""
+        return self.filter(
+            name=model._meta.label_lower
+        ).values_list('version', flat=True).first() or 0
+
+    def stamp(self, *models):
+        """Функция для получения версий данных нескольких моделей."""
+        names = [model._meta.label_lower for model in models]
+        versions = dict(
+            self.filter(name__in=names).values_list('name', 'version')
+        )
+        return tuple(versions.get(name, 0) for name in names)
+
+    def bump(self, model):
+        """Функция для увеличения версии данных модели."""
+        name = model._meta.label_lower
+        if not self.filter(name=name).update(version=F('version') + 1):
+            self.get_or_create(name=name, defaults={'version': 1})
+
+
+class DataVersion(models.Model):
+    """Класс модели DataVersion.
+
+    Счетчик изменений справочной таблицы, по которому процессы
+    узнают, что их копия данных в памяти устарела.
+    """
+
+    name = models.CharField(
+        'Модель',
+        max_length=DATA_VERSION_NAME_MAX_LENGTH,
+        unique=True
+    )
+    version = models.PositiveBigIntegerField('Версия', default=0)
+
+    objects = DataVersionQuerySet.as_manager()
+
+    class Meta:
+        """Класс определяет метаданные для модели."""
+
+        verbose_name = 'версию данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        """Функция для переопределния имени объекта модели."""
+        return f'{self.name}: {self.version}'
+
+
 class Ingredient(models.Model):
     """Класс модели Ingredient."""
 
@@ -77,6 +135,83 @@ class Tag(models.Model):
         return f'Тег: {self.name}'
 
 
+class RecipeQuerySet(CounterQuerySet):
+    """Класс набора запросов для модели Recipe."""
+
+    def with_user_flags(self, user):
+        """Функция для добавления флагов рецептов для пользователя.
+
+        Флаги избранного, корзины и подписки на автора вычисляются
+        в самом запросе, поэтому для страницы рецептов они получаются
+        без запросов на каждый рецепт.
+        """
+        if user.is_authenticated:
+            is_favorited = Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ))
+            is_in_shopping_cart = Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ))
+            author_is_subscribed = Exists(Follow.objects.filter(
+                user=user, following=OuterRef('author')
+            ))
+        else:
+            is_favorited = is_in_shopping_cart = author_is_subscribed = Value(
+                False, output_field=BooleanField()
+            )
+        return self.annotate(
+            is_favorited=is_favorited,
+            is_in_shopping_cart=is_in_shopping_cart,
+            author_is_subscribed=author_is_subscribed
+        )
+
+    def with_related(self):
+        """Функция для подгрузки автора, тегов и ингредиентов рецептов."""
+        return self.defer('search_vector').select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_recipe',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            )
+        )
+
+    def ingredient_amounts(self):
+        """Функция для получения суммарных количеств ингредиентов."""
+        return dict(IngredientRecipe.objects.filter(
+            recipe__in=self
+        ).values('ingredient_id').annotate(
+            total=Sum('amount')
+        ).values_list('ingredient_id', 'total').order_by())
+
+    def first_per_author(self, authors, limit=None):
+        """Функция для получения первых рецептов нескольких авторов.
+
+        Рецепты всех авторов выбираются одним запросом: номер рецепта
+        внутри автора считается оконной функцией ROW_NUMBER.
+        """
+        queryset = self.filter(author__in=authors)
+        if limit is None:
+            return list(queryset)
+        queryset = queryset.annotate(
+            author_rank=Window(
+                expression=RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('created_at').desc()
+            )
+        ).order_by()
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return []
+        return list(self.raw(
+            f'SELECT * FROM ({sql}) AS ranked_recipes '
+            'WHERE author_rank <= %s ORDER BY created_at DESC',
+            (*params, limit)
+        ))
+
+
 class Recipe(models.Model):
     """Класс модели Recipe."""
 
@@ -105,10 +240,28 @@ class Recipe(models.Model):
         ]
     )
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
     short_url = models.CharField(
         unique=True,
+        null=True,
+        editable=False,
         max_length=RECIPE_SHORT_URL_MAX_LENGTH
     )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+    favorites_count = models.PositiveIntegerField(
+        'Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Добавлений в корзину',
+        default=0,
+        editable=False
+    )
 
     author = models.ForeignKey(
         User,
@@ -126,28 +279,34 @@ class Recipe(models.Model):
         verbose_name='Ингредиенты'
     )
 
+    objects = RecipeQuerySet.as_manager()
+
     def save(self, **kwargs):
-        """Функция для сохранения данных."""
-        if not self.short_url:
-            self.short_url = self.get_short_url()
-        super().save(**kwargs)
-
-    def get_short_url(self):
-        """Функция для получения короткой ссылки"""
-        short_url = ''.join(choices(CHARACTERS, k=10))
-        recipe_with_short_url = Recipe.objects.filter(
-            short_url=short_url
-        ).exists()
-        while recipe_with_short_url:
-            short_url = short_url
-        return short_url
+        """Функция для сохранения данных.
+
+        Короткая ссылка однозначно вычисляется по id, поэтому новая
+        запись сохраняется без нее, а затем ссылка дописывается.
+        """
+        with transaction.atomic():
+            super().save(**kwargs)
+            if not self.short_url:
+                self.short_url = encode_short_url(self.pk)
+                Recipe.objects.filter(pk=self.pk).update(
+                    short_url=self.short_url
+                )
 
     class Meta:
         """Класс определяет метаданные для модели."""
 
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-created_at',)
+        ordering = ('-created_at', '-id')
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='recipe_created_at_id_idx'
+            )
+        ]
 
     def __str__(self):
         """Функция для переопределния имени объекта модели."""
@@ -186,6 +345,12 @@ class IngredientRecipe(models.Model):
 
         verbose_name = 'ингредиент в рецепт'
         verbose_name_plural = 'Ингредиенты добавленные в рецепт'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='recipe_ingredient_unique'
+            )
+        ]
 
     def __str__(self):
         """Функция для переопределния имени объекта модели."""
@@ -195,6 +360,8 @@ class IngredientRecipe(models.Model):
 class Favorite(models.Model):
     """Класс модели Favorite."""
 
+    counter_field = 'favorites_count'
+
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
@@ -208,11 +375,19 @@ class Favorite(models.Model):
         verbose_name='Пользователь'
     )
 
+    objects = RelationQuerySet.as_manager()
+
     class Meta:
         """Класс определяет метаданные для модели."""
 
         verbose_name = 'в избранное'
         verbose_name_plural = 'Избранное'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='user_favorite_recipe_unique'
+            )
+        ]
 
     def __str__(self):
         """Функция для переопределния имени объекта модели."""
@@ -222,6 +397,8 @@ class Favorite(models.Model):
 class ShoppingCart(models.Model):
     """Класс модели ShoppingCart."""
 
+    counter_field = 'in_carts_count'
+
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,
@@ -235,12 +412,118 @@ class ShoppingCart(models.Model):
         verbose_name='Пользователь'
     )
 
+    objects = RelationQuerySet.as_manager()
+
     class Meta:
         """Класс определяет метаданные для модели."""
 
         verbose_name = 'в корзину'
         verbose_name_plural = 'Корзина'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='user_cart_recipe_unique'
+            )
+        ]
 
     def __str__(self):
         """Функция для переопределния имени объекта модели."""
         return f'{self.user} добавил(а) {self.recipe} в корзину'
+
+
+class ShoppingCartIngredientQuerySet(models.QuerySet):
+    """Класс набора запросов для модели ShoppingCartIngredient."""
+
+    def apply_amounts(self, user_ids, amounts):
+        """Функция для изменения итоговых количеств в списках покупок.
+
+        amounts — словарь {id ингредиента: изменение количества},
+        изменение применяется к спискам всех переданных пользователей.
+        Вызывается в той же транзакции, что и изменение корзины.
+        """
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        if not user_ids or not amounts:
+            return
+        self.bulk_create(
+            [
+                self.model(
+                    user_id=user_id, ingredient_id=ingredient_id, amount=0
+                )
+                for user_id in user_ids
+                for ingredient_id, amount in amounts.items() if amount > 0
+            ],
+            ignore_conflicts=True
+        )
+        items = self.filter(user_id__in=user_ids, ingredient_id__in=amounts)
+        items.update(amount=F('amount') + Case(
+            *[
+                When(ingredient_id=ingredient_id, then=Value(amount))
+                for ingredient_id, amount in amounts.items()
+            ],
+            output_field=IntegerField()
+        ))
+        items.filter(amount__lte=0).delete()
+
+    def calculate(self, user_ids=None):
+        """Функция для подсчета списков покупок по содержимому корзин.
+
+        Если передан user_ids, считаются только списки этих пользователей.
+        """
+        if user_ids is None:
+            rows = IngredientRecipe.objects.filter(
+                recipe__user_cart__isnull=False
+            )
+        else:
+            rows = IngredientRecipe.objects.filter(
+                recipe__user_cart__user__in=user_ids
+            )
+        return rows.values(
+            'recipe__user_cart__user', 'ingredient'
+        ).annotate(
+            total=Sum('amount')
+        ).values_list(
+            'recipe__user_cart__user', 'ingredient', 'total'
+        ).order_by()
+
+
+class ShoppingCartIngredient(models.Model):
+    """Класс модели ShoppingCartIngredient.
+
+    Итоговое количество ингредиента в корзине пользователя,
+    которое поддерживается при изменении корзины и рецептов.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='in_carts',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField('Количество')
+
+    objects = ShoppingCartIngredientQuerySet.as_manager()
+
+    class Meta:
+        """Класс определяет метаданные для модели."""
+
+        verbose_name = 'ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='user_ingredient_unique'
+            )
+        ]
+
+    def __str__(self):
+        """Функция для переопределния имени объекта модели."""
+        return f'{self.ingredient} в списке покупок {self.user}'
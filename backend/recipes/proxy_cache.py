@@ -0,0 +1,71 @@
+"""Сброс ответов с рецептами, сохраненных в кэше прокси.
+
+Анонимные ответы со списком и страницей рецепта кэшируются в nginx.
+Ответ помечается суррогатными ключами рецептов, тегов и авторов,
+а после записи рецепт запрашивается через внутренний сервер прокси
+из PROXY_CACHE_URLS, недоступный снаружи, с публичным именем сайта
+в Host, и nginx заменяет сохраненный ответ.
+
+Ответы рецептов содержат названия тегов, ингредиентов и данные
+авторов, поэтому при их изменении сбрасываются и рецепты с ними.
+"""
+
+import logging
+
+import requests
+from django.conf import settings
+from django.urls import reverse
+
+from foodgram.constants import PROXY_CACHE_REFRESH_TIMEOUT
+from tasks.queue import task
+
+
+logger = logging.getLogger(__name__)
+
+RECIPES_KEY = 'recipes'
+
+
+def recipe_key(recipe_id):
+    """Функция для получения суррогатного ключа рецепта."""
+    return f'recipe-{recipe_id}'
+
+
+def tag_key(slug):
+    """Функция для получения суррогатного ключа тега."""
+    return f'tag-{slug}'
+
+
+def author_key(author_id):
+    """Функция для получения суррогатного ключа автора."""
+    return f'author-{author_id}'
+
+
+@task
+def refresh(recipe_ids):
+    """Функция для обновления ответов рецептов в кэше прокси."""
+    headers = {'Accept': 'application/json'}
+    if settings.PROXY_CACHE_HOST:
+        headers['Host'] = settings.PROXY_CACHE_HOST
+    for base_url in settings.PROXY_CACHE_URLS:
+        for recipe_id in recipe_ids:
+            url = base_url.rstrip('/') + reverse(
+                'recipes-detail', args=[recipe_id]
+            )
+            try:
+                requests.get(
+                    url, headers=headers, timeout=PROXY_CACHE_REFRESH_TIMEOUT
+                )
+            except requests.RequestException:
+                logger.warning('Не удалось обновить кэш прокси: %s', url)
+
+
+def purge(recipe_ids):
+    """Функция для сброса рецептов фоновой задачей.
+
+    Списки рецептов по ключу не сбрасываются: их адресов слишком
+    много, поэтому они хранятся в прокси недолго и проверяются по ETag.
+    """
+    recipe_ids = sorted(set(recipe_ids))
+    if not settings.PROXY_CACHE_URLS or not recipe_ids:
+        return
+    refresh.delay(recipe_ids)
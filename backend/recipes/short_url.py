@@ -0,0 +1,118 @@
+"""Короткие ссылки на рецепты."""
+
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from foodgram.constants import (
+    SHORT_URL_ALPHABET,
+    SHORT_URL_BITS,
+    SHORT_URL_CACHE_SIZE,
+    SHORT_URL_CACHE_TIMEOUT,
+    SHORT_URL_LENGTH,
+    SHORT_URL_MULTIPLIERS
+)
+from foodgram.prometheus import record_cache
+
+
+MASK = (1 << SHORT_URL_BITS) - 1
+SHIFT = SHORT_URL_BITS // 2
+
+
+def permute(number):
+    """Функция для взаимно однозначного перемешивания числа.
+
+    Умножение на нечетное число и xorshift обратимы по модулю
+    2 ** SHORT_URL_BITS, поэтому разные id дают разные коды.
+    """
+    for multiplier in SHORT_URL_MULTIPLIERS:
+        number = (number * multiplier) & MASK
+        number ^= number >> SHIFT
+    return number
+
+
+def encode(recipe_id):
+    """Функция для получения короткого кода по id рецепта."""
+    if not 0 < recipe_id <= MASK:
+        raise ValueError(f'id {recipe_id} вне диапазона коротких ссылок')
+    number = permute(recipe_id)
+    base = len(SHORT_URL_ALPHABET)
+    code = []
+    for _ in range(SHORT_URL_LENGTH):
+        number, index = divmod(number, base)
+        code.append(SHORT_URL_ALPHABET[index])
+    return ''.join(reversed(code))
+
+
+class LRUCache:
+    """Потокобезопасный LRU кэш ограниченного размера."""
+
+    def __init__(self, maxsize):
+        """Функция для создания пустого кэша."""
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, key):
+        """Функция для получения значения по ключу."""
+        with self.lock:
+            value = self.data.get(key)
+            if value is not None:
+                self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Функция для сохранения значения по ключу."""
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        """Функция для удаления значения по ключу."""
+        with self.lock:
+            self.data.pop(key, None)
+
+
+local_cache = LRUCache(SHORT_URL_CACHE_SIZE)
+
+
+def get_cache_key(code):
+    """Функция для получения ключа общего кэша."""
+    return f'short_url:{code}'
+
+
+def resolve(code):
+    """Функция для получения id рецепта по короткой ссылке.
+
+    Сначала проверяется LRU кэш процесса, затем общий кэш и только
+    после этого БД, поэтому популярные ссылки обходятся без запросов.
+    """
+    from .models import Recipe
+
+    recipe_id = local_cache.get(code)
+    if recipe_id is not None:
+        record_cache('short_url_local', hits=1)
+        return recipe_id
+    record_cache('short_url_local', misses=1)
+    recipe_id = cache.get(get_cache_key(code))
+    if recipe_id is None:
+        record_cache('short_url', misses=1)
+        recipe_id = Recipe.objects.filter(
+            short_url=code
+        ).values_list('id', flat=True).first()
+        if recipe_id is None:
+            return None
+        cache.set(get_cache_key(code), recipe_id, SHORT_URL_CACHE_TIMEOUT)
+    else:
+        record_cache('short_url', hits=1)
+    local_cache.set(code, recipe_id)
+    return recipe_id
+
+
+def forget(code):
+    """Функция для удаления короткой ссылки из кэшей."""
+    local_cache.delete(code)
+    cache.delete(get_cache_key(code))
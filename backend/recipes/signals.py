@@ -0,0 +1,218 @@
+"""Обработчики сигналов для моделей рецептов."""
+
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import images, proxy_cache, short_url, tasks
+from .models import (
+    DataVersion, Favorite, Ingredient, IngredientRecipe, Recipe,
+    ShoppingCart, ShoppingCartIngredient, Tag
+)
+
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_data_version(sender, **kwargs):
+    """Функция для увеличения версии справочных данных."""
+    DataVersion.objects.bump(sender)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_recipe_version(sender, **kwargs):
+    """Функция для увеличения версии данных рецептов.
+
+    Изменение тегов тоже меняет количество рецептов по фильтру тегов.
+    """
+    DataVersion.objects.bump(Recipe)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_tags_version(sender, action, **kwargs):
+    """Функция для увеличения версии данных при изменении тегов."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        DataVersion.objects.bump(Recipe)
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_url(sender, instance, **kwargs):
+    """Функция для удаления короткой ссылки рецепта из кэшей."""
+    if instance.short_url:
+        short_url.forget(instance.short_url)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_version(sender, update_fields=None, **kwargs):
+    """Функция для увеличения версии данных пользователей.
+
+    Вход пользователя меняет только last_login и версию не меняет.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    DataVersion.objects.bump(User)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def purge_recipe(sender, instance, **kwargs):
+    """Функция для сброса рецепта в кэше прокси."""
+    proxy_cache.purge([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def purge_tag_recipes(sender, instance, **kwargs):
+    """Функция для сброса рецептов с тегом в кэше прокси.
+
+    При удалении рецепты собираются до того, как удалятся связи.
+    """
+    proxy_cache.purge(
+        Recipe.objects.filter(tags=instance).values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def purge_ingredient_recipes(sender, instance, **kwargs):
+    """Функция для сброса рецептов с ингредиентом в кэше прокси.
+
+    При удалении рецепты собираются до того, как удалятся связи.
+    """
+    proxy_cache.purge(
+        Recipe.objects.filter(
+            ingredient_recipe__ingredient=instance
+        ).values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=User)
+def purge_author_recipes(sender, instance, update_fields=None, **kwargs):
+    """Функция для сброса рецептов автора в кэше прокси."""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    proxy_cache.purge(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Recipe)
+def make_recipe_renditions(sender, instance, **kwargs):
+    """Функция для создания уменьшенных копий изображения рецепта."""
+    if images.get_targets(instance.image, images.RECIPE_RENDITIONS):
+        tasks.make_renditions.delay(
+            Recipe._meta.label_lower, instance.pk, 'image',
+            images.RECIPE_RENDITIONS, 'updated_at'
+        )
+
+
+@receiver(post_save, sender=User)
+def make_avatar_renditions(sender, instance, update_fields=None, **kwargs):
+    """Функция для создания уменьшенных копий аватара."""
+    if update_fields is not None and 'avatar' not in update_fields:
+        return
+    if images.get_targets(instance.avatar, images.AVATAR_RENDITIONS):
+        tasks.make_renditions.delay(
+            User._meta.label_lower, instance.pk, 'avatar',
+            images.AVATAR_RENDITIONS, 'avatar'
+        )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def change_recipes_count(sender, instance, signal, created=False, **kwargs):
+    """Функция для изменения количества рецептов автора.
+
+    Рецепты создаются и удаляются еще и в админке, поэтому счетчик
+    меняется сигналом, в той же транзакции, что и запись рецепта.
+    """
+    if signal is post_save and not created:
+        return
+    User.objects.filter(pk=instance.author_id).change_count(
+        'recipes_count', 1 if created else -1
+    )
+
+
+@receiver(pre_delete, sender=User)
+def release_user_counts(sender, instance, **kwargs):
+    """Функция для уменьшения счетчиков перед удалением пользователя.
+
+    Избранное, корзина и подписки пользователя удаляются каскадом
+    без изменения счетчиков, поэтому они уменьшаются заранее.
+    """
+    for model in (Favorite, ShoppingCart):
+        Recipe.objects.filter(
+            id__in=model.objects.filter(user=instance).values('recipe_id')
+        ).change_count(model.counter_field, -1)
+    User.objects.filter(followers__user=instance).change_count(
+        'followers_count', -1
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def change_cart_ingredients(sender, instance, signal, created=False,
+                            **kwargs):
+    """Функция для изменения списка покупок при изменении корзины.
+
+    Корзина меняется еще и в админке и каскадно при удалении рецепта
+    или пользователя. При каскадном удалении вычитаются только
+    ингредиенты, которые еще не удалены: каждая пара корзины и
+    ингредиента вычитается один раз, в каком бы порядке ни удалялись
+    записи.
+    """
+    if signal is post_save and not created:
+        return
+    amounts = dict(IngredientRecipe.objects.filter(
+        recipe_id=instance.recipe_id
+    ).values_list('ingredient_id', 'amount'))
+    if not created:
+        amounts = {
+            ingredient_id: -amount for ingredient_id, amount in amounts.items()
+        }
+    ShoppingCartIngredient.objects.apply_amounts([instance.user_id], amounts)
+
+
+@receiver(pre_save, sender=IngredientRecipe)
+def remember_ingredient_amount(sender, instance, **kwargs):
+    """Функция для запоминания сохраненного ингредиента рецепта."""
+    instance.saved_amount = None
+    if instance.pk is not None:
+        instance.saved_amount = IngredientRecipe.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def change_recipe_cart_ingredients(sender, instance, signal, **kwargs):
+    """Функция для изменения списков покупок при изменении рецепта.
+
+    Сигналы срабатывают при изменении ингредиентов в админке и при
+    удалении записей; массовые изменения из API применяют разницу
+    сами. Изменение применяется к корзинам, которые еще не удалены.
+    """
+    amounts = Counter()
+    if signal is post_save:
+        amounts[instance.ingredient_id] += instance.amount
+        if getattr(instance, 'saved_amount', None) is not None:
+            ingredient_id, amount = instance.saved_amount
+            amounts[ingredient_id] -= amount
+    else:
+        amounts[instance.ingredient_id] -= instance.amount
+    ShoppingCartIngredient.objects.apply_amounts(
+        list(ShoppingCart.objects.filter(
+            recipe_id=instance.recipe_id
+        ).values_list('user_id', flat=True)),
+        amounts
+    )
@@ -0,0 +1,21 @@
+"""Фоновые задачи приложения recipes."""
+
+from django.apps import apps
+
+from tasks.queue import task
+from . import images
+
+
+@task
+def make_renditions(model_label, pk, field, renditions, touch_field):
+    """Функция для создания копий изображения записи.
+
+    После создания копий запись сохраняется, и обычные обработчики
+    сохранения меняют версии данных и сбрасывают кэши, поэтому
+    ответы получают адреса копий.
+    """
+    instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    if images.make_renditions(getattr(instance, field), renditions):
+        instance.save(update_fields=[touch_field])
@@ -0,0 +1,24 @@
+"""Админ-зона для фоновых задач."""
+
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    """Класс для управление админ-зоной."""
+
+    list_display = [
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'created_at',
+        'finished_at'
+    ]
+    list_filter = ['status']
+    search_fields = ['name']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+
+admin.site.register(Task, TaskAdmin)
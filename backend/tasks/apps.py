@@ -0,0 +1,11 @@
+"""Приложение tasks."""
+
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    """Класс для создания приложения."""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tasks'
+    verbose_name = 'Фоновые задачи'
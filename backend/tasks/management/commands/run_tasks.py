@@ -0,0 +1,89 @@
+"""Файл для запуска обработчика фоновых задач."""
+
+import logging
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from foodgram.constants import TASK_POLL_INTERVAL, TASK_RETENTION
+from tasks.models import Task
+from tasks.queue import run
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Класс для выполнения задач из очереди в пуле потоков.
+
+    Задачи захватываются по мере освобождения потоков, упавшие задачи
+    повторяются с растущей задержкой, а задачи остановленных
+    обработчиков возвращаются в очередь через TASK_TIMEOUT секунд.
+    """
+
+    help = 'Выполняет фоновые задачи из очереди в БД'
+
+    def add_arguments(self, parser):
+        """Функция для добавления аргументов команды."""
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASK_WORKERS
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=TASK_POLL_INTERVAL
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Завершиться, когда очередь опустеет'
+        )
+
+    def run_task(self, task):
+        """Функция для выполнения одной задачи в потоке пула."""
+        started = time.monotonic()
+        try:
+            run(task)
+        except Exception:
+            logger.exception('Задача %s #%s завершилась ошибкой',
+                             task.name, task.id)
+            task.fail(traceback.format_exc())
+        else:
+            task.complete()
+            logger.info(
+                'Задача %s #%s: ожидание %.3f с, выполнение %.3f с',
+                task.name,
+                task.id,
+                (task.started_at - task.created_at).total_seconds(),
+                time.monotonic() - started
+            )
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        """Функция для выполнения задач, пока команда не остановлена."""
+        workers = options['workers']
+        poll_interval = options['poll_interval']
+        running = set()
+        last_cleanup = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                if time.monotonic() - last_cleanup > poll_interval * 60:
+                    Task.objects.requeue_stale(settings.TASK_TIMEOUT)
+                    Task.objects.delete_finished(TASK_RETENTION)
+                    last_cleanup = time.monotonic()
+                free = workers - len(running)
+                for task in Task.objects.claim(free) if free else []:
+                    running.add(pool.submit(self.run_task, task))
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                _, running = wait(
+                    running, timeout=poll_interval,
+                    return_when=FIRST_COMPLETED
+                )
+        self.stdout.write(self.style.SUCCESS('Очередь задач пуста'))
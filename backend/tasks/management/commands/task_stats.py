@@ -0,0 +1,23 @@
+"""Файл для вывода состояния очереди фоновых задач."""
+
+from django.core.management.base import BaseCommand
+
+from foodgram.constants import TASK_RETENTION
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    """Класс для вывода глубины очереди и задержек задач."""
+
+    help = 'Показывает глубину очереди и задержки фоновых задач'
+
+    def handle(self, *args, **options):
+        """Функция для вывода состояния очереди."""
+        stats = Task.objects.stats(TASK_RETENTION)
+        for status, label in Task.STATUSES:
+            self.stdout.write(f'{label}: {stats["depth"].get(status, 0)}')
+        self.stdout.write(
+            f'Самая старая задача в очереди: {stats["oldest_age"]}'
+        )
+        self.stdout.write(f'Среднее ожидание: {stats["avg_wait"]}')
+        self.stdout.write(f'Среднее выполнение: {stats["avg_run"]}')
@@ -0,0 +1,175 @@
+"""Модели для создания БД."""
+
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import Avg, Count, DurationField, F, Min
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from foodgram.constants import (
+    TASK_BACKOFF,
+    TASK_MAX_ATTEMPTS,
+    TASK_NAME_MAX_LENGTH,
+    TASK_STATUS_MAX_LENGTH
+)
+
+
+class TaskQuerySet(models.QuerySet):
+    """Класс набора запросов для модели Task."""
+
+    def claim(self, limit):
+        """Функция для захвата готовых к выполнению задач.
+
+        Строки блокируются с SKIP LOCKED, поэтому несколько
+        обработчиков не получают одну и ту же задачу.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(self.filter(
+                status=Task.QUEUED, run_at__lte=now
+            ).order_by('run_at', 'id').select_for_update(
+                skip_locked=True
+            ).values_list('id', flat=True)[:limit])
+            self.filter(id__in=ids, status=Task.QUEUED).update(
+                status=Task.RUNNING,
+                started_at=now,
+                attempts=F('attempts') + 1
+            )
+        return list(self.filter(
+            id__in=ids, status=Task.RUNNING, started_at=now
+        ))
+
+    def requeue_stale(self, timeout):
+        """Функция для возврата в очередь задач упавших обработчиков."""
+        now = timezone.now()
+        stale = self.filter(
+            status=Task.RUNNING,
+            started_at__lt=now - timedelta(seconds=timeout)
+        )
+        stale.filter(attempts__gte=F('max_attempts')).update(
+            status=Task.FAILED,
+            finished_at=now,
+            last_error='Превышено время выполнения'
+        )
+        return stale.update(status=Task.QUEUED, run_at=now)
+
+    def delete_finished(self, retention):
+        """Функция для удаления старых выполненных задач."""
+        return self.filter(
+            status=Task.DONE,
+            finished_at__lt=timezone.now() - timedelta(seconds=retention)
+        ).delete()[0]
+
+    def stats(self, period):
+        """Функция для получения глубины очереди и задержек.
+
+        Задержка в очереди и время выполнения усредняются
+        по задачам, выполненным за последние period секунд.
+        """
+        now = timezone.now()
+        depth = dict(
+            self.values_list('status').annotate(count=Count('id')).order_by()
+        )
+        oldest = self.filter(
+            status=Task.QUEUED, run_at__lte=now
+        ).aggregate(oldest=Min('run_at'))['oldest']
+        durations = self.filter(
+            status=Task.DONE,
+            finished_at__gte=now - timedelta(seconds=period)
+        ).aggregate(
+            wait=Avg(Cast(
+                F('started_at') - F('created_at'), DurationField()
+            )),
+            run=Avg(Cast(
+                F('finished_at') - F('started_at'), DurationField()
+            ))
+        )
+        return {
+            'depth': depth,
+            'oldest_age': now - oldest if oldest else None,
+            'avg_wait': durations['wait'],
+            'avg_run': durations['run']
+        }
+
+
+class Task(models.Model):
+    """Класс модели Task."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Функция', max_length=TASK_NAME_MAX_LENGTH)
+    args = models.JSONField('Аргументы', default=list)
+    status = models.CharField(
+        'Статус',
+        max_length=TASK_STATUS_MAX_LENGTH,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток',
+        default=TASK_MAX_ATTEMPTS
+    )
+    run_at = models.DateTimeField('Выполнить после', default=timezone.now)
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    started_at = models.DateTimeField('Дата запуска', null=True, blank=True)
+    finished_at = models.DateTimeField(
+        'Дата завершения',
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        """Класс определяет метаданные для модели."""
+
+        verbose_name = 'задачу'
+        verbose_name_plural = 'Задачи'
+        ordering = ('-created_at',)
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'],
+                name='task_status_run_at_idx'
+            )
+        ]
+
+    def __str__(self):
+        """Функция для переопределния имени объекта модели."""
+        return f'Задача: {self.name}'
+
+    def complete(self):
+        """Функция для отметки задачи выполненной."""
+        self.status = Task.DONE
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'finished_at'])
+
+    def fail(self, error):
+        """Функция для повтора задачи с задержкой или отметки ошибки.
+
+        Задержка перед повтором удваивается с каждой попыткой.
+        """
+        now = timezone.now()
+        self.last_error = error
+        if self.attempts < self.max_attempts:
+            self.status = Task.QUEUED
+            self.run_at = now + timedelta(
+                seconds=TASK_BACKOFF * 2 ** (self.attempts - 1)
+            )
+        else:
+            self.status = Task.FAILED
+            self.finished_at = now
+        self.save(update_fields=[
+            'status', 'run_at', 'finished_at', 'last_error'
+        ])
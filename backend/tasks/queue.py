@@ -0,0 +1,54 @@
+"""Постановка функций в очередь фоновых задач.
+
+Функция, обернутая декоратором task, вызывается как обычно,
+а методы delay и enqueue добавляют ее вызов в таблицу задач,
+откуда ее выполняет команда run_tasks. Аргументы сохраняются
+в JSON, поэтому должны быть простыми значениями.
+"""
+
+from functools import partial, update_wrapper
+
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from foodgram.constants import TASK_MAX_ATTEMPTS
+from .models import Task
+
+
+class TaskFunction:
+    """Функция, которую можно выполнить в фоне."""
+
+    def __init__(self, func, max_attempts):
+        """Функция для создания обертки над функцией задачи."""
+        update_wrapper(self, func)
+        self.func = func
+        self.max_attempts = max_attempts
+        self.name = f'{func.__module__}.{func.__qualname__}'
+
+    def __call__(self, *args):
+        """Функция для вызова задачи в текущем процессе."""
+        return self.func(*args)
+
+    def enqueue(self, *args):
+        """Функция для добавления задачи в очередь."""
+        return Task.objects.create(
+            name=self.name,
+            args=list(args),
+            max_attempts=self.max_attempts
+        )
+
+    def delay(self, *args):
+        """Функция для добавления задачи после фиксации транзакции."""
+        transaction.on_commit(partial(self.enqueue, *args))
+
+
+def task(func=None, *, max_attempts=TASK_MAX_ATTEMPTS):
+    """Функция-декоратор для объявления фоновой задачи."""
+    if func is None:
+        return partial(task, max_attempts=max_attempts)
+    return TaskFunction(func, max_attempts)
+
+
+def run(task):
+    """Функция для выполнения задачи из очереди."""
+    return import_string(task.name)(*task.args)
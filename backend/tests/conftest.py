@@ -0,0 +1,100 @@
+"""Общие фикстуры для тестов API."""
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.ingredient_index import IngredientIndex
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Фикстура для очистки кэша между тестами."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_ingredient_index(monkeypatch):
+    """Фикстура для чистого индекса ингредиентов в каждом тесте.
+
+    Версии данных в разных тестах совпадают, поэтому индекс,
+    построенный в предыдущем тесте, нельзя переиспользовать.
+    """
+    monkeypatch.setattr(
+        'api.views.ingredient_index', IngredientIndex()
+    )
+
+
+@pytest.fixture
+def user(django_user_model):
+    """Фикстура пользователя."""
+    return django_user_model.objects.create_user(
+        username='user', email='user@example.com', password='password',
+        first_name='Имя', last_name='Фамилия'
+    )
+
+
+@pytest.fixture
+def author(django_user_model):
+    """Фикстура автора рецептов."""
+    return django_user_model.objects.create_user(
+        username='author', email='author@example.com', password='password',
+        first_name='Имя', last_name='Фамилия'
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    """Фикстура клиента, авторизованного пользователем."""
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def author_client(author):
+    """Фикстура клиента, авторизованного автором."""
+    client = APIClient()
+    client.force_authenticate(author)
+    return client
+
+
+@pytest.fixture
+def tag():
+    """Фикстура тега."""
+    return Tag.objects.create(name='Завтрак', slug='breakfast')
+
+
+@pytest.fixture
+def ingredients():
+    """Фикстура ингредиентов."""
+    return [
+        Ingredient.objects.create(name=f'Ингредиент {i}', measurement_unit='г')
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def make_recipe(author, tag):
+    """Фикстура для создания рецепта с ингредиентами."""
+    def make_recipe(amounts, name='Рецепт', recipe_author=None):
+        recipe = Recipe.objects.create(
+            name=name, text='Текст', image='recipes_image/test.png',
+            cooking_time=10, author=recipe_author or author
+        )
+        recipe.tags.add(tag)
+        IngredientRecipe.objects.bulk_create([
+            IngredientRecipe(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+            for ingredient, amount in amounts.items()
+        ])
+        return recipe
+    return make_recipe
@@ -0,0 +1,18 @@
+"""Настройки для запуска тестов на SQLite."""
+
+import tempfile
+
+from foodgram.settings import *  # noqa: F401, F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+PROXY_CACHE_URLS = []
+
+SERVER_TIMING = True
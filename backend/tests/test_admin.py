@@ -0,0 +1,37 @@
+"""Тесты админ-зоны."""
+
+import pytest
+from django.test import Client
+
+
+@pytest.fixture
+def admin_client(django_user_model):
+    """Фикстура клиента, вошедшего в админ-зону."""
+    admin = django_user_model.objects.create_superuser(
+        username='admin', email='admin@example.com', password='password',
+        first_name='Имя', last_name='Фамилия'
+    )
+    client = Client()
+    client.force_login(admin)
+    return client
+
+
+@pytest.mark.django_db
+def test_recipe_admin_ingredients(admin_client, make_recipe, ingredients,
+                                  monkeypatch):
+    """Ингредиенты большого рецепта редактируются списком по страницам."""
+    recipe = make_recipe({ingredient: 1 for ingredient in ingredients})
+    url = f'/admin/recipes/recipe/{recipe.id}/change/'
+    response = admin_client.get(url)
+    assert response.status_code == 200
+    assert 'ingredient_recipe-TOTAL_FORMS' in response.content.decode()
+    monkeypatch.setattr('recipes.admin.ADMIN_INLINE_MAX_ROWS', 2)
+    response = admin_client.get(url)
+    content = response.content.decode()
+    assert 'ingredient_recipe-TOTAL_FORMS' not in content
+    assert f'recipe__id__exact={recipe.id}' in content
+    response = admin_client.get(
+        f'/admin/recipes/ingredientrecipe/?recipe__id__exact={recipe.id}'
+    )
+    assert response.status_code == 200
+    assert 'Ингредиент 2' in response.content.decode()
@@ -0,0 +1,80 @@
+"""Тесты пакетных операций."""
+
+import pytest
+
+from recipes.models import ShoppingCart, ShoppingCartIngredient
+
+
+def get_statuses(response):
+    """Функция для получения статусов пакета по id."""
+    return [(item['id'], item['status']) for item in response.json()]
+
+
+@pytest.mark.django_db
+def test_shopping_cart_batch(user, user_client, make_recipe, ingredients):
+    """Повторы и уже добавленные рецепты не меняют счетчики дважды."""
+    first = make_recipe({ingredients[0]: 10})
+    second = make_recipe({ingredients[0]: 5, ingredients[1]: 1})
+    ShoppingCart.objects.create(user=user, recipe=second)
+    response = user_client.post(
+        '/api/recipes/batch/shopping_cart/',
+        {'ids': [first.id, first.id, second.id, 999999]},
+        format='json'
+    )
+    assert response.status_code == 200
+    assert get_statuses(response) == [
+        (first.id, 'created'),
+        (second.id, 'unchanged'),
+        (999999, 'not_found')
+    ]
+    first.refresh_from_db()
+    assert first.in_carts_count == 1
+    assert dict(ShoppingCartIngredient.objects.filter(
+        user=user
+    ).values_list('ingredient_id', 'amount')) == {
+        ingredients[0].id: 15, ingredients[1].id: 1
+    }
+    response = user_client.delete(
+        '/api/recipes/batch/shopping_cart/',
+        {'ids': [second.id, second.id, 999999]},
+        format='json'
+    )
+    assert response.status_code == 200
+    assert get_statuses(response) == [
+        (second.id, 'deleted'),
+        (999999, 'not_found')
+    ]
+    second.refresh_from_db()
+    assert second.in_carts_count == 0
+    assert dict(ShoppingCartIngredient.objects.filter(
+        user=user
+    ).values_list('ingredient_id', 'amount')) == {ingredients[0].id: 10}
+
+
+@pytest.mark.django_db
+def test_subscribe_batch(user, user_client, author):
+    """Подписка пакетом пропускает себя и повторы."""
+    response = user_client.post(
+        '/api/users/batch/subscribe/',
+        {'ids': [author.id, author.id, user.id]},
+        format='json'
+    )
+    assert response.status_code == 200
+    assert get_statuses(response) == [
+        (author.id, 'created'),
+        (user.id, 'not_found')
+    ]
+    response = user_client.post(
+        '/api/users/batch/subscribe/', {'ids': [author.id]}, format='json'
+    )
+    assert get_statuses(response) == [(author.id, 'unchanged')]
+    author.refresh_from_db()
+    assert author.followers_count == 1
+    response = user_client.delete(
+        '/api/users/batch/subscribe/',
+        {'ids': [author.id, author.id]},
+        format='json'
+    )
+    assert get_statuses(response) == [(author.id, 'deleted')]
+    author.refresh_from_db()
+    assert author.followers_count == 0
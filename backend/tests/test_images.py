@@ -0,0 +1,32 @@
+"""Тесты уменьшенных копий изображений."""
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+
+from recipes import images
+from recipes.models import Recipe
+
+
+def test_rendition_urls_cached_when_ready():
+    """Полный набор копий кэшируется, неполный проверяется заново."""
+    field_file = FieldFile(
+        None, Recipe._meta.get_field('image'), 'recipes_image/cached.png'
+    )
+    names = [
+        images.rendition_name(field_file.name, rendition, format)
+        for rendition in images.RECIPE_RENDITIONS
+        for format in images.get_formats()
+    ]
+    default_storage.save(names[0], ContentFile(b''))
+    urls = images.get_rendition_urls(field_file, images.RECIPE_RENDITIONS)
+    assert sum(map(len, urls.values())) == 1
+    for name in names[1:]:
+        default_storage.save(name, ContentFile(b''))
+    urls = images.get_rendition_urls(field_file, images.RECIPE_RENDITIONS)
+    assert sum(map(len, urls.values())) == len(names)
+    for name in names:
+        default_storage.delete(name)
+    assert images.get_rendition_urls(
+        field_file, images.RECIPE_RENDITIONS
+    ) == urls
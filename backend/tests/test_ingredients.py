@@ -0,0 +1,27 @@
+"""Тесты поиска ингредиентов."""
+
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient
+
+
+@pytest.mark.django_db
+def test_ingredient_search_etag(ingredients, settings):
+    """Поиск строит ETag по версии индекса, а не по версии в БД."""
+    settings.INGREDIENT_INDEX_CHECK_INTERVAL = 0
+    client = APIClient()
+    response = client.get('/api/ingredients/?name=ингр')
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    etag = response['ETag']
+    response = client.get(
+        '/api/ingredients/?name=ингр', HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == 304
+    Ingredient.objects.create(name='Ингредиент 3', measurement_unit='г')
+    response = client.get(
+        '/api/ingredients/?name=ингр', HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 4
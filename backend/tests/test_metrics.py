@@ -0,0 +1,14 @@
+"""Тесты замеров запросов."""
+
+import pytest
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+def test_server_timing_only_for_staff(user, user_client):
+    """Заголовок Server-Timing получают только сотрудники."""
+    assert 'Server-Timing' not in APIClient().get('/api/tags/')
+    assert 'Server-Timing' not in user_client.get('/api/tags/')
+    user.is_staff = True
+    user.save()
+    assert 'Server-Timing' in user_client.get('/api/tags/')
@@ -0,0 +1,58 @@
+"""Тесты пагинации списков."""
+
+import base64
+import json
+
+import pytest
+
+
+def make_cursor(*values):
+    """Функция для создания курсора из значений."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.django_db
+def test_recipes_cursor_pages(user_client, make_recipe, ingredients):
+    """Курсор листает рецепты от новых к старым без повторов."""
+    recipes = [
+        make_recipe({ingredients[0]: 1}, name=f'Рецепт {number}')
+        for number in range(3)
+    ]
+    response = user_client.get('/api/recipes/?cursor=&limit=2')
+    assert response.status_code == 200
+    data = response.json()
+    assert [item['id'] for item in data['results']] == [
+        recipes[2].id, recipes[1].id
+    ]
+    response = user_client.get(data['next'])
+    assert [item['id'] for item in response.json()['results']] == [
+        recipes[0].id
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('cursor', [
+    make_cursor(False, '2024-01-01T00:00:00', 'abc'),
+    make_cursor(False, 'вчера', 1),
+    make_cursor(False, None, 1),
+    make_cursor(False, '2024-01-01T00:00:00', [1]),
+    'не курсор',
+])
+def test_recipes_invalid_cursor(user_client, cursor):
+    """Неверный курсор возвращает 404, а не ошибку сервера."""
+    response = user_client.get('/api/recipes/', {'cursor': cursor})
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_recipes_search_ignores_cursor(user_client, make_recipe, ingredients):
+    """Курсор не меняет порядок результатов поиска."""
+    match = make_recipe({ingredients[0]: 1}, name='pasta')
+    other = make_recipe({ingredients[0]: 1}, name='salad')
+    other.text = 'salad with pasta'
+    other.save()
+    response = user_client.get('/api/recipes/?search=pasta&cursor=')
+    assert response.status_code == 200
+    assert [item['id'] for item in response.json()['results']] == [
+        match.id, other.id
+    ]
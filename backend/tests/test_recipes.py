@@ -0,0 +1,24 @@
+"""Тесты рецептов."""
+
+import pytest
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('pk', ['abc', '999999'])
+def test_recipe_not_found(client, user_client, pk):
+    """Несуществующий или нечисловой id рецепта возвращает 404."""
+    for api_client in (client, user_client):
+        response = api_client.get(f'/api/recipes/{pk}/')
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_recipe_not_modified(client, make_recipe, ingredients):
+    """Повторный запрос рецепта с ETag возвращает 304."""
+    recipe = make_recipe({ingredients[0]: 1})
+    response = client.get(f'/api/recipes/{recipe.id}/')
+    assert response.status_code == 200
+    response = client.get(
+        f'/api/recipes/{recipe.id}/', HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert response.status_code == 304
@@ -0,0 +1,151 @@
+"""Тесты списков покупок."""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from recipes.models import (
+    Ingredient, IngredientRecipe, ShoppingCart, ShoppingCartIngredient
+)
+
+
+def get_totals(user):
+    """Функция для получения списка покупок пользователя."""
+    return dict(ShoppingCartIngredient.objects.filter(
+        user=user
+    ).values_list('ingredient_id', 'amount'))
+
+
+def assert_consistent():
+    """Функция для сверки списков покупок с корзинами."""
+    expected = {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total
+        in ShoppingCartIngredient.objects.calculate()
+    }
+    actual = {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount
+        in ShoppingCartIngredient.objects.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        )
+    }
+    assert actual == expected
+
+
+@pytest.mark.django_db
+def test_shopping_cart_add_and_delete(user, user_client, make_recipe,
+                                      ingredients):
+    """Добавление и удаление рецепта меняют список покупок."""
+    first = make_recipe({ingredients[0]: 10, ingredients[1]: 5})
+    second = make_recipe({ingredients[0]: 3}, name='Второй')
+    for recipe in (first, second):
+        response = user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        assert response.status_code == 201
+    assert get_totals(user) == {ingredients[0].id: 13, ingredients[1].id: 5}
+    response = user_client.delete(f'/api/recipes/{first.id}/shopping_cart/')
+    assert response.status_code == 204
+    assert get_totals(user) == {ingredients[0].id: 3}
+
+
+@pytest.mark.django_db
+def test_shopping_cart_after_recipe_patch(user, author_client, make_recipe,
+                                          ingredients, tag):
+    """Изменение ингредиентов рецепта меняет списки покупок."""
+    recipe = make_recipe({ingredients[0]: 10, ingredients[1]: 5})
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    response = author_client.patch(
+        f'/api/recipes/{recipe.id}/',
+        {
+            'ingredients': [
+                {'id': ingredients[0].id, 'amount': 7},
+                {'id': ingredients[2].id, 'amount': 2}
+            ],
+            'tags': [tag.id]
+        },
+        format='json'
+    )
+    assert response.status_code == 200
+    assert get_totals(user) == {ingredients[0].id: 7, ingredients[2].id: 2}
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_shopping_cart_after_recipe_delete(user, author_client, make_recipe,
+                                           ingredients):
+    """Удаление рецепта убирает его ингредиенты из списков покупок."""
+    recipe = make_recipe({ingredients[0]: 10})
+    other = make_recipe({ingredients[0]: 1}, name='Другой')
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    ShoppingCart.objects.create(user=user, recipe=other)
+    response = author_client.delete(f'/api/recipes/{recipe.id}/')
+    assert response.status_code == 204
+    assert get_totals(user) == {ingredients[0].id: 1}
+
+
+@pytest.mark.django_db
+def test_shopping_cart_after_model_changes(user, author, make_recipe,
+                                           ingredients):
+    """Изменения в обход API, как в админке, меняют списки покупок."""
+    recipe = make_recipe({ingredients[0]: 10, ingredients[1]: 5})
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    row = IngredientRecipe.objects.get(
+        recipe=recipe, ingredient=ingredients[0]
+    )
+    row.amount = 4
+    row.save()
+    IngredientRecipe.objects.create(
+        recipe=recipe, ingredient=ingredients[2], amount=1
+    )
+    IngredientRecipe.objects.filter(
+        recipe=recipe, ingredient=ingredients[1]
+    ).delete()
+    assert get_totals(user) == {ingredients[0].id: 4, ingredients[2].id: 1}
+    assert_consistent()
+    author.delete()
+    assert get_totals(user) == {}
+
+
+@pytest.mark.django_db
+def test_recipe_patch_queries(user, author_client, make_recipe, tag,
+                              django_assert_max_num_queries):
+    """Удаление ингредиентов не меняет списки покупок построчно."""
+    ingredients = [
+        Ingredient.objects.create(name=f'Продукт {i}', measurement_unit='г')
+        for i in range(5)
+    ]
+    recipe = make_recipe({ingredient: 10 for ingredient in ingredients})
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    with django_assert_max_num_queries(22):
+        response = author_client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': 5}
+                    for ingredient in ingredients[:2]
+                ],
+                'tags': [tag.id]
+            },
+            format='json'
+        )
+    assert response.status_code == 200
+    assert get_totals(user) == {
+        ingredient.id: 5 for ingredient in ingredients[:2]
+    }
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_rebuild_shopping_lists(user, make_recipe, ingredients):
+    """Команда пересчитывает испорченные списки покупок."""
+    recipe = make_recipe({ingredients[0]: 10, ingredients[1]: 5})
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    ShoppingCartIngredient.objects.filter(
+        ingredient=ingredients[0]
+    ).update(amount=1)
+    ShoppingCartIngredient.objects.create(
+        user=user, ingredient=ingredients[2], amount=3
+    )
+    call_command('rebuild_shopping_lists', stdout=StringIO())
+    assert get_totals(user) == {ingredients[0].id: 10, ingredients[1].id: 5}
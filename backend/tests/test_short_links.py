@@ -0,0 +1,20 @@
+"""Тесты коротких ссылок."""
+
+import pytest
+
+
+@pytest.mark.django_db
+def test_short_link_redirect(client, make_recipe, ingredients):
+    """Короткая ссылка перенаправляет на страницу рецепта."""
+    recipe = make_recipe({ingredients[0]: 1})
+    recipe.refresh_from_db()
+    response = client.get(f'/api/{recipe.short_url}/')
+    assert response.status_code == 302
+    assert response['Location'].endswith(f'/recipes/{recipe.id}/')
+
+
+@pytest.mark.django_db
+def test_short_link_unknown(client):
+    """Неизвестная короткая ссылка возвращает 404."""
+    response = client.get('/api/zzzzzzz/')
+    assert response.status_code == 404
@@ -0,0 +1,22 @@
+"""Тесты снимков справочников."""
+
+import pytest
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('accept_encoding, encoding', [
+    ('gzip, br', 'br'),
+    ('gzip, br;q=0', 'gzip'),
+    ('br;q=0.5, gzip', 'gzip'),
+    ('br;q=0, gzip;q=0', None),
+    ('identity', None),
+])
+def test_tags_snapshot_encoding(tag, accept_encoding, encoding):
+    """Снимок учитывает веса сжатий и имеет свой ETag для каждого."""
+    client = APIClient()
+    response = client.get('/api/tags/', HTTP_ACCEPT_ENCODING=accept_encoding)
+    assert response.status_code == 200
+    assert response.get('Content-Encoding') == encoding
+    plain = client.get('/api/tags/', HTTP_ACCEPT_ENCODING='identity')
+    assert (response['ETag'] == plain['ETag']) == (encoding is None)
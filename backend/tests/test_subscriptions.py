@@ -0,0 +1,28 @@
+"""Тесты подписок на авторов."""
+
+import pytest
+
+from users.models import Follow
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', ['', '?recipes_limit=3'])
+def test_subscriptions_empty(user_client, params):
+    """Список подписок без подписок возвращает пустую страницу."""
+    response = user_client.get(f'/api/users/subscriptions/{params}')
+    assert response.status_code == 200
+    assert response.json()['results'] == []
+
+
+@pytest.mark.django_db
+def test_subscriptions_recipes_limit(user, user_client, author, make_recipe,
+                                     ingredients):
+    """Рецепты автора в подписках ограничиваются recipes_limit."""
+    for number in range(3):
+        make_recipe({ingredients[0]: 1}, name=f'Рецепт {number}')
+    Follow.objects.create(user=user, following=author)
+    response = user_client.get('/api/users/subscriptions/?recipes_limit=2')
+    assert response.status_code == 200
+    result, = response.json()['results']
+    assert len(result['recipes']) == 2
+    assert result['recipes_count'] == 3
@@ -3,17 +3,45 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 
+from api.pagination import EstimatedCountPaginator
 from .models import Follow
 
 
 User = get_user_model()
 
 
+class UserAdmin(admin.ModelAdmin):
+    """Класс для управление админ-зоной."""
+
+    list_display = [
+        'username',
+        'email',
+        'first_name',
+        'last_name',
+        'recipes_count',
+        'followers_count'
+    ]
+    readonly_fields = ['recipes_count', 'followers_count']
+    search_fields = ['username', 'email']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 class FollowAdmin(admin.ModelAdmin):
     """Класс для управление админ-зоной."""
 
-    search_fields = ['email', 'username']
+    list_display = ['user', 'following']
+    list_select_related = ['user', 'following']
+    search_fields = [
+        '=user__username',
+        '=user__email',
+        '=following__username',
+        '=following__email'
+    ]
+    autocomplete_fields = ['user', 'following']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
-admin.site.register(User)
+admin.site.register(User, UserAdmin)
 admin.site.register(Follow, FollowAdmin)
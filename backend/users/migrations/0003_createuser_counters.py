@@ -0,0 +1,30 @@
+# Generated by Django 3.2 on 2026-10-17 04:50
+
+from django.db import migrations, models
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_createuser_options'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='createuser',
+            managers=[
+                ('objects', users.models.CreateUserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='createuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='createuser',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+    ]
@@ -1,11 +1,87 @@
 """Модели для создания БД."""
 
-from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db import connections, models
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.contrib.auth.models import AbstractUser, UserManager
 
 from foodgram.constants import CREATE_USER_MAX_LENGTH
 
 
+class CounterQuerySet(models.QuerySet):
+    """Класс набора запросов для моделей со счетчиками."""
+
+    def change_count(self, field, delta):
+        """Функция для изменения счетчика выражением F.
+
+        Счетчик меняется в самом UPDATE, поэтому одновременные запросы
+        не теряют изменения друг друга, и не опускается ниже нуля.
+        """
+        return self.update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+class RelationQuerySet(models.QuerySet):
+    """Класс набора запросов для связей пользователя с объектами.
+
+    Пакетные добавление и удаление возвращают id объектов, для которых
+    запись действительно создана или удалена, поэтому счетчики
+    меняются ровно на число измененных строк, даже если тот же пакет
+    одновременно обрабатывается в другом запросе.
+    """
+
+    def execute_returning(self, sql, params):
+        """Функция для выполнения запроса с RETURNING."""
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_columns(self, field):
+        """Функция для получения таблицы и столбцов связи."""
+        opts = self.model._meta
+        quote_name = connections[self.db].ops.quote_name
+        return (
+            quote_name(opts.db_table),
+            quote_name(opts.get_field('user').column),
+            quote_name(opts.get_field(field).column)
+        )
+
+    def add_relations(self, user_id, field, ids):
+        """Функция для добавления связей без повторов.
+
+        Возвращает id объектов, связи с которыми созданы этим запросом.
+        """
+        if not ids:
+            return []
+        table, user_column, column = self.get_columns(field)
+        return self.execute_returning(
+            f'INSERT INTO {table} ({user_column}, {column}) VALUES '
+            + ', '.join(['(%s, %s)'] * len(ids))
+            + f' ON CONFLICT DO NOTHING RETURNING {column}',
+            [value for item_id in ids for value in (user_id, item_id)]
+        )
+
+    def remove_relations(self, user_id, field, ids):
+        """Функция для удаления связей.
+
+        Возвращает id объектов, связи с которыми удалены этим запросом.
+        Удаление выполняется без сигналов, изменения в других таблицах
+        применяет вызывающий код.
+        """
+        if not ids:
+            return []
+        table, user_column, column = self.get_columns(field)
+        return self.execute_returning(
+            f'DELETE FROM {table} WHERE {user_column} = %s '
+            f'AND {column} IN ({", ".join(["%s"] * len(ids))}) '
+            f'RETURNING {column}',
+            [user_id, *ids]
+        )
+
+
+class CreateUserManager(UserManager.from_queryset(CounterQuerySet)):
+    """Класс менеджера модели User со счетчиками."""
+
+
 class CreateUser(AbstractUser):
     """Класс модели User."""
 
@@ -23,6 +99,18 @@ class CreateUser(AbstractUser):
         upload_to='avatar_image',
         blank=True
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False
+    )
+
+    objects = CreateUserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'username']
@@ -55,6 +143,8 @@ class Follow(models.Model):
         verbose_name='Подписчики'
     )
 
+    objects = RelationQuerySet.as_manager()
+
     class Meta:
         """Класс определяет метаданные для модели Follow."""
 